@@ -0,0 +1,274 @@
+'''
+Benchmark suite for parsing bitmaps, emitting C arrays and extracting fonts.
+
+Synthesizes ARGB8888 bitmaps (BITMAPV3INFOHEADER) and glyph sheets of various
+sizes, measures wall time, throughput (MB/s of input) and peak memory for each
+stage, and saves the results as JSON. Optionally, the results are compared
+against a stored baseline:
+
+    python benchmarks/run_benchmarks.py -o results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --threshold 0.2
+
+For quick regression checks, use smaller images (e.g., `--sizes 16 64 256`).
+'''
+from pathlib import Path
+
+import sys
+
+# Allow running the script from a source checkout (without installing the package).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bmp_argb8888_to_c.bitmap_argb8888 import BitmapARGB8888
+from bmp_argb8888_to_c.bitmap_to_array import BitmapToArray
+from bmp_argb8888_to_c.bitmap_to_font import BitmapToFont
+from bmp_argb8888_to_c.util import blockify, convert_hex_string_to_c_array_elements, ELEMENT_SEPARATOR
+
+import argparse
+import json
+import platform
+import random
+import struct
+import tempfile
+import time
+import tracemalloc
+
+# Default image sizes (square images, width = height).
+DEFAULT_SIZES = (16, 64, 256, 1024, 4096)
+
+# Default glyph sheets (number of glyphs, glyph width, glyph height).
+DEFAULT_GLYPH_SHEETS = ((16, 8, 16), (96, 8, 16), (96, 16, 32), (96, 24, 48))
+
+# Largest image size for the legacy string-based stage (blockify).
+MAX_LEGACY_SIZE = 1024
+
+# Differences below these values are never reported as regressions (noise).
+MIN_DIFFERENCE = {
+    'wall_time_s': 1e-3,
+    'peak_memory_bytes': 64 * 1024,
+}
+
+class NullWriter:
+    '''
+    File-like object that only counts the number of written characters.
+    '''
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+def write_bitmap(file_name, width, height, pixels):
+    '''
+    Write ARGB8888 bitmap file (BITMAPV3INFOHEADER, no gap).
+    '''
+    header = struct.pack('<2sIIIIiiHHIIiiIIHHHHII',
+        b'BM', 70 + len(pixels), 0, 70,
+        56, width, height, 1, 32, 3, len(pixels), 2835, 2835, 0, 0,
+        0, 0xFF, 0xFF00, 0, 0xFF, 0xFF000000)
+    with open(file_name, 'wb') as file:
+        file.write(header)
+        file.write(pixels)
+
+def synthesize_image(file_name, size, seed = 0):
+    '''
+    Synthesize square image with a mix of flat areas, gradients and noise.
+    '''
+    rng = random.Random(seed)
+    xs = bytes(x & 0xFF for x in range(size))
+    noise = bytes(rng.randrange(256) for _ in range(4 * 256))
+    rows = []
+    for y in range(size):
+        if y % 3 == 0:
+            # Noise.
+            row = (noise * (size // 256 + 1))[:4 * size]
+        else:
+            # Gradients (with long runs in the alpha channel).
+            row = bytearray(4 * size)
+            row[0::4] = xs
+            row[1::4] = bytes([y & 0xFF]) * size
+            row[2::4] = xs.translate(bytes(v ^ (y & 0xFF) for v in range(256)))
+            row[3::4] = b'\xFF' * size
+        rows.append(bytes(row))
+    write_bitmap(file_name, size, size, b''.join(rows))
+
+def synthesize_glyph_sheet(file_name, n_glyphs, glyph_width, glyph_height, seed = 0):
+    '''
+    Synthesize glyph sheet (all glyphs in a single row) with anti-aliased shapes.
+    '''
+    rng = random.Random(seed)
+    width = n_glyphs * glyph_width
+    alpha = bytearray(width * glyph_height)
+    for g in range(n_glyphs):
+        for y in range(glyph_height // 8, glyph_height - glyph_height // 8):
+            for x in range(glyph_width // 4, glyph_width - glyph_width // 4):
+                alpha[y * width + g * glyph_width + x] = rng.choice((0, 0, 255, 255, rng.randrange(256)))
+    pixels = bytearray(4 * len(alpha))
+    pixels[3::4] = alpha
+    write_bitmap(file_name, width, glyph_height, bytes(pixels))
+
+def measure(func, repeat):
+    '''
+    Measure best wall time (of several runs) and peak memory (separate run with tracemalloc).
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (min(times), peak)
+
+def run_stage(results, stage, case, input_size, func, repeat):
+    '''
+    Run a single benchmark stage and add the result.
+    '''
+    (wall_time, peak_memory) = measure(func, repeat)
+    result = dict(
+        stage = stage,
+        case = case,
+        input_bytes = input_size,
+        wall_time_s = wall_time,
+        throughput_mb_s = input_size / wall_time / 1e6 if wall_time > 0 else None,
+        peak_memory_bytes = peak_memory,
+    )
+    results.append(result)
+    print(f'{stage:<20} {case:<16} {wall_time * 1e3:10.2f} ms {result["throughput_mb_s"] or 0:10.2f} MB/s {peak_memory / 1e6:10.2f} MB')
+
+def run_benchmarks(sizes, glyph_sheets, repeat, directory):
+    '''
+    Run all benchmark stages for all synthesized inputs.
+    '''
+    results = []
+
+    for size in sizes:
+        file_name = Path(directory) / f'image_{size}.bmp'
+        synthesize_image(file_name, size)
+        input_size = file_name.stat().st_size
+        case = f'{size}x{size}'
+
+        run_stage(results, 'parse', case, input_size, lambda: BitmapARGB8888(file_name), repeat)
+        run_stage(results, 'parse_mmap', case, input_size, lambda: BitmapARGB8888(file_name, use_mmap = True), repeat)
+
+        bmp = BitmapToArray(file_name, use_mmap = True)
+        run_stage(results, 'as_c_array', case, input_size, lambda: bmp.write_c_array(NullWriter()), repeat)
+        run_stage(results, 'as_c_array_aligned', case, input_size, lambda: bmp.write_c_array(NullWriter(), aligned = True), repeat)
+
+        if size <= MAX_LEGACY_SIZE:
+            separator = ',{}'.format(ELEMENT_SEPARATOR)
+            elements = separator.join(convert_hex_string_to_c_array_elements(bmp.pixel_array)) + separator
+            run_stage(results, 'blockify', case, input_size, lambda: blockify(elements), repeat)
+
+    for (n_glyphs, glyph_width, glyph_height) in glyph_sheets:
+        file_name = Path(directory) / f'glyphs_{n_glyphs}_{glyph_width}x{glyph_height}.bmp'
+        synthesize_glyph_sheet(file_name, n_glyphs, glyph_width, glyph_height)
+        input_size = file_name.stat().st_size
+        case = f'{n_glyphs}@{glyph_width}x{glyph_height}'
+
+        font = BitmapToFont(file_name, glyph_height, glyph_width)
+        run_stage(results, 'font_alpha', case, input_size, font.font_alpha, repeat)
+        run_stage(results, 'as_c_font', case, input_size, lambda: font.write_c_font(NullWriter()), repeat)
+
+    return results
+
+def compare(results, baseline, threshold):
+    '''
+    Compare results against baseline. Returns list of regressions (wall time or
+    peak memory more than `threshold` above baseline, ignoring tiny differences).
+    '''
+    reference = {(r['stage'], r['case']): r for r in baseline['results']}
+    regressions = []
+
+    for result in results:
+        ref = reference.get((result['stage'], result['case']))
+        if ref is None:
+            continue
+        for metric in ('wall_time_s', 'peak_memory_bytes'):
+            if result[metric] - ref[metric] < MIN_DIFFERENCE[metric]:
+                continue
+            if result[metric] > ref[metric] * (1 + threshold):
+                regressions.append((result['stage'], result['case'], metric, ref[metric], result[metric]))
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = 'Benchmark parsing, emitting and font extraction.'
+    )
+
+    parser.add_argument(
+        '-o', '--output-file',
+        default = 'benchmark_results.json',
+        action = 'store',
+        metavar = 'OUTPUT_FILE',
+        help = 'output file for results (JSON, default: benchmark_results.json)'
+    )
+
+    parser.add_argument(
+        '--sizes',
+        type = int,
+        nargs = '+',
+        default = list(DEFAULT_SIZES),
+        metavar = 'SIZE',
+        help = f'image sizes (width = height, default: {" ".join(map(str, DEFAULT_SIZES))})'
+    )
+
+    parser.add_argument(
+        '--repeat',
+        type = int,
+        default = 3,
+        action = 'store',
+        metavar = 'REPEAT',
+        help = 'number of runs per stage (best wall time is reported, default: 3)'
+    )
+
+    parser.add_argument(
+        '--baseline',
+        default = None,
+        action = 'store',
+        metavar = 'BASELINE_FILE',
+        help = 'compare results against this baseline (JSON)'
+    )
+
+    parser.add_argument(
+        '--threshold',
+        type = float,
+        default = 0.2,
+        action = 'store',
+        metavar = 'THRESHOLD',
+        help = 'relative regression threshold (default: 0.2, i.e., 20%%)'
+    )
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_benchmarks(args.sizes, DEFAULT_GLYPH_SHEETS, args.repeat, directory)
+
+    with open(args.output_file, 'w') as file:
+        json.dump(dict(
+            python = platform.python_version(),
+            platform = platform.platform(),
+            results = results,
+        ), file, indent = 2)
+
+    print(f'Results written to {args.output_file}')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.threshold)
+        for (stage, case, metric, ref, value) in regressions:
+            print(f'REGRESSION {stage} {case}: {metric} {ref:.4g} -> {value:.4g}')
+
+        if regressions:
+            sys.exit(1)
+
+        print('No regressions')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Supported number of bits per pixel for alpha masks.
+ALPHA_BITS_PER_PIXEL = (1, 2, 4, 8)
+
+def alpha_row_size(width, bpp):
+    '''
+    Number of bytes per row of an alpha mask (rows are byte-aligned).
+    '''
+    return (width * bpp + 7) // 8
+
+def quantize_alpha(alpha, width, height, bpp, dither = False):
+    '''
+    Quantize 8-bit alpha values (row by row, top left to bottom right) to the given
+    number of bits per pixel. Returns one quantized level per byte.
+
+    With dithering, the quantization error is distributed to neighboring pixels
+    (Floyd-Steinberg).
+    '''
+    if bpp not in ALPHA_BITS_PER_PIXEL:
+        raise RuntimeError(f'Unsupported number of bits per pixel for alpha: {bpp}')
+
+    levels = (1 << bpp) - 1
+
+    if bpp == 8:
+        return bytes(alpha)
+
+    if not dither:
+        # Round to nearest level (applied to all pixels at once).
+        table = bytes((a * levels + 127) // 255 for a in range(256))
+        return bytes(alpha).translate(table)
+
+    # Floyd-Steinberg dithering (quantization error in units of 8-bit alpha).
+    values = [float(a) for a in alpha]
+    quantized = bytearray(len(values))
+    for y in range(height):
+        for x in range(width):
+            i = y * width + x
+            value = min(max(values[i], 0.), 255.)
+            level = int(value * levels / 255. + .5)
+            quantized[i] = level
+            error = value - level * 255. / levels
+            if x + 1 < width:
+                values[i + 1] += error * 7 / 16
+            if y + 1 < height:
+                if x > 0:
+                    values[i + width - 1] += error * 3 / 16
+                values[i + width] += error * 5 / 16
+                if x + 1 < width:
+                    values[i + width + 1] += error * 1 / 16
+
+    return bytes(quantized)
+
+def pack_alpha(levels, width, height, bpp):
+    '''
+    Pack quantized alpha levels (one per byte) into rows of `bpp` bits per pixel.
+
+    Each row starts at a byte boundary. Within a byte, the first pixel is stored
+    in the least significant bits (as expected by the DMA2D for A4 input).
+    '''
+    if bpp == 8:
+        return bytes(levels)
+
+    pixels_per_byte = 8 // bpp
+    row_size = alpha_row_size(width, bpp)
+
+    packed = bytearray(row_size * height)
+    for y in range(height):
+        row = levels[y * width:(y + 1) * width]
+        for k in range(pixels_per_byte):
+            # Pixels at position k within each byte of the row.
+            part = row[k::pixels_per_byte]
+            shift = k * bpp
+            for (j, level) in enumerate(part):
+                packed[y * row_size + j] |= level << shift
+
+    return bytes(packed)
+
+def crop_alpha(levels, width, height):
+    '''
+    Crop alpha levels (one per byte, row by row) to the bounding box of all
+    non-zero levels. Returns the bounding box (x, y, width, height) and the cropped
+    levels. For fully transparent input, the bounding box is empty (all zeros).
+    '''
+    rows = [bytes(levels[y * width:(y + 1) * width]) for y in range(height)]
+    used = [y for (y, row) in enumerate(rows) if any(row)]
+    if not used:
+        return ((0, 0, 0, 0), b'')
+
+    (top, bottom) = (used[0], used[-1] + 1)
+    left = min(len(row) - len(row.lstrip(b'\0')) for row in rows[top:bottom] if any(row))
+    right = max(len(row.rstrip(b'\0')) for row in rows[top:bottom])
+
+    cropped = b''.join(row[left:right] for row in rows[top:bottom])
+    return ((left, top, right - left, bottom - top), cropped)
@@ -0,0 +1,97 @@
+from bmp_argb8888_to_c.cache import ConversionCache
+from bmp_argb8888_to_c.conversion import CONVERSION_MODES, convert_file
+from bmp_argb8888_to_c.instrumentation import Profiler
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from glob import glob
+from pathlib import Path
+
+def find_input_files(patterns):
+    '''
+    Retrieve list of input files from file names, directories (all bitmap files
+    contained in the directory) and glob patterns.
+    '''
+    input_files = []
+
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(p for p in path.iterdir() if p.suffix.lower() == '.bmp' and p.is_file())
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = sorted(Path(p) for p in glob(pattern, recursive = True) if Path(p).is_file())
+            if not matches:
+                raise RuntimeError(f'No input files found for: {pattern}')
+
+        input_files.extend(matches)
+
+    # Remove duplicates (keeping the order).
+    return list(dict.fromkeys(p.resolve() for p in input_files))
+
+def _convert_task(task):
+    '''
+    Convert a single bitmap file, returning the error message instead of raising.
+    If profiling, the records of all stages are returned as well (otherwise None).
+    '''
+    (input_file, output_dir, mode, cache_dir, profile, options) = task
+    profiler = Profiler() if profile else None
+    try:
+        out_file = Path(output_dir) / (Path(input_file).stem + CONVERSION_MODES[mode])
+        cache = ConversionCache(cache_dir) if cache_dir else None
+        with profiler or nullcontext():
+            convert_file(input_file, out_file, mode, cache, **options)
+        return (input_file, out_file, None, profiler and profiler.records)
+    except Exception as err:
+        return (input_file, None, str(err), profiler and profiler.records)
+
+def convert_files(input_files, output_dir, mode, jobs = None, cache_dir = None, executor = None, trace = None,
+        **options):
+    '''
+    Convert bitmap files in parallel (using up to `jobs` processes) and write the
+    results to the output directory. If a cache directory is given, unchanged
+    inputs are not converted again (see class `ConversionCache`). Additional
+    options are passed on to the conversion (see function `convert_file`).
+
+    If an executor is given (e.g., a process pool that is kept alive between calls),
+    it is used instead of starting a new process pool.
+
+    If a list is given as `trace`, each conversion is profiled and the records of
+    all stages (see class `Profiler`) are appended to the list.
+
+    Returns a list with a tuple (input file, output file, error message) for each
+    input file. For successful conversions, the error message is None. For failed
+    conversions, the output file is None.
+    '''
+    # Check for input files that would result in the same output file.
+    stems = {}
+    for input_file in input_files:
+        stems.setdefault(Path(input_file).stem, []).append(input_file)
+
+    duplicates = {f for files in stems.values() if len(files) > 1 for f in files}
+
+    tasks = [
+        (input_file, output_dir, mode, cache_dir, trace is not None, options)
+        for input_file in input_files if input_file not in duplicates
+        ]
+
+    if executor is not None:
+        outcomes = list(executor.map(_convert_task, tasks))
+    elif jobs == 1 or len(tasks) <= 1:
+        outcomes = [_convert_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers = jobs) as executor:
+            outcomes = list(executor.map(_convert_task, tasks, chunksize = 4))
+
+    results = [(input_file, out_file, error) for (input_file, out_file, error, _) in outcomes]
+    if trace is not None:
+        for (_, _, _, records) in outcomes:
+            trace.extend(records)
+
+    results.extend(
+        (input_file, None, 'Output file name clashes with another input file')
+        for input_file in input_files if input_file in duplicates
+        )
+
+    return results
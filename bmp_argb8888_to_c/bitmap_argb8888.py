@@ -1,66 +1,231 @@
-from bmp_argb8888_to_c.util import convert_little_endian_hex_to_decimal
+from bmp_argb8888_to_c.instrumentation import stage
+from bmp_argb8888_to_c.transform import ROTATIONS_90, check_transform, transform_pixels, transform_size
 
 from binascii import hexlify
+from collections import namedtuple
+from functools import cached_property
 from pathlib import Path
 
+import mmap
+import struct
+
+# Layout of the bitmap file header and the DIB header (BITMAPV3INFOHEADER),
+# given as pairs of field name and (little-endian) struct format.
+HEADER_FIELDS = (
+    # Bitmap file header.
+    ('signature', '2s'),
+    ('file_size', 'I'),
+    ('reserved', 'I'),
+    ('offset_pixel_array', 'I'),
+    # DIB header.
+    ('header_size', 'I'),
+    ('image_width', 'i'),
+    ('image_height', 'i'),
+    ('num_color_planes', 'H'),
+    ('bits_per_pixel', 'H'),
+    ('compression', 'I'),
+    ('image_size', 'I'),
+    ('x_pixels_per_meter', 'i'),
+    ('y_pixels_per_meter', 'i'),
+    ('color_table', 'I'),
+    ('important_color', 'I'),
+    ('resolution_units', 'H'),
+    ('padding', 'H'),
+    ('fill_direction', 'H'),
+    ('halftoning_algo', 'H'),
+    ('halftoning_param_1', 'I'),
+    ('halftoning_param_2', 'I'),
+)
+
+# Struct for parsing both headers in one go.
+HEADER_STRUCT = struct.Struct('<' + ''.join(fmt for (_, fmt) in HEADER_FIELDS))
+
+# Size of both headers in bytes, i.e., the default offset of the pixel array for ARGB8888.
+HEADER_SIZE = HEADER_STRUCT.size
+
+# Typed (decoded) header fields.
+BitmapHeader = namedtuple('BitmapHeader', [name for (name, _) in HEADER_FIELDS])
+
+def _header_field_slices():
+    # Compute start and stop position (in bytes) of each header field.
+    slices = {}
+    start = 0
+    for (name, fmt) in HEADER_FIELDS:
+        stop = start + struct.calcsize('<' + fmt)
+        slices[name] = slice(start, stop)
+        start = stop
+    return slices
+
+# Position of each header field within the raw header bytes.
+HEADER_FIELD_SLICES = _header_field_slices()
+
 class BitmapARGB8888:
     '''
     Read content of bitmap file in ARGB8888 format and convert to C array.
+
+    The headers are parsed into typed integer fields (see attribute `header`), the
+    pixel data is exposed as memoryview (attribute `pixel_data`). Optionally, the
+    file content is memory-mapped instead of read into memory.
+
+    In lazy mode, only the headers are read when constructing the object. The rest
+    of the file is read (or memory-mapped) on first access to the pixel data, e.g.,
+    when converting. This makes inspecting the metadata of many files cheap.
+
+    Optionally, the image is transformed (flipped or rotated, see `TRANSFORMS`)
+    and its rows are stored in the given order (`top_down`, None to keep the order
+    of the file). The headers are updated accordingly (e.g., negative image height
+    for top-down rows), the pixel data is transformed on first access.
+
+    For backward compatibility, all header fields, the gap and the pixel array
+    are also available as strings of (upper-case) hexadecimal digits, using the
+    original attribute names (e.g., `image_width` or `pixel_array`). These are
+    computed lazily on first access.
     '''
 
-    def __init__(self, file_name):
+    def __init__(self, file_name, use_mmap = False, lazy = False, transform = None, top_down = None):
         # File path.
         self.file_name = Path(file_name).resolve(strict = True)
+        self.use_mmap = use_mmap
+
+        check_transform(transform)
+        self.transform = transform
+
+        # Retrieve headers (in lazy mode without reading the rest of the file).
+        if lazy:
+            with open(self.file_name, 'rb') as file:
+                header_bytes = file.read(HEADER_SIZE)
+        else:
+            header_bytes = self._data[:HEADER_SIZE]
 
-        # Retrieve content of binary file as string of hexadecimal digits.
-        file = open(self.file_name, 'rb')
-        hexData = hexlify(file.read()).decode('utf-8').upper()
+        with stage('parse', self.file_name, len(header_bytes)):
+            self._parse_headers(header_bytes)
 
-        # Retrieve bitmap file header.
-        self.signature = hexData[0:4]
-        self.file_size = hexData[4:12]
-        self.reserved = hexData[12:20]
-        self.offset_pixel_array = hexData[20:28]
+        # Original size and row order (for transforming the pixel data).
+        self._source = (self.header.image_width, abs(self.header.image_height), self.header.image_height < 0)
+        if transform is not None or (top_down is not None and top_down != self._source[2]):
+            self._transform_headers(transform, self._source[2] if top_down is None else top_down)
+        else:
+            self._source = None
+
+    def _parse_headers(self, header_bytes):
+        '''
+        Parse and check bitmap file header and DIB header.
+        '''
+        # Sanity check for file size.
+        if len(header_bytes) < HEADER_SIZE:
+            raise RuntimeError(f'File too small: expected at least {HEADER_SIZE} bytes, got {len(header_bytes)}')
+
+        # Retrieve bitmap file header and DIB header.
+        self.header_bytes = bytes(header_bytes)
+        self.header = BitmapHeader._make(HEADER_STRUCT.unpack(self.header_bytes))
 
         # Sanity check for signature.
-        if not self.signature == '424D':
+        if not self.header.signature == b'BM':
             raise RuntimeError(f'Invalid signature: {self.signature}')
 
-        # Retrieve DIB header.
-        self.header_size = hexData[28:36]
-        self.image_width = hexData[36:44]
-        self.image_height = hexData[44:52]
-        self.num_color_planes = hexData[52:56]
-        self.bits_per_pixel = hexData[56:60]
-        self.compression = hexData[60:68]
-        self.image_size = hexData[68:76]
-        self.x_pixels_per_meter = hexData[76:84]
-        self.y_pixels_per_meter = hexData[84:92]
-        self.color_table = hexData[92:100]
-        self.important_color = hexData[100:108]
-        self.resolution_units = hexData[108:112]
-        self.padding = hexData[112:116]
-        self.fill_direction = hexData[116:120]
-        self.halftoning_algo = hexData[120:124]
-        self.halftoning_param_1 = hexData[124:132]
-        self.halftoning_param_2 = hexData[132:140]
-
         # Sanity check for DIB header.
-        header_size = convert_little_endian_hex_to_decimal(self.header_size)
-        if not 56 == header_size:
+        if not 56 == self.header.header_size:
             raise RuntimeError('Unexpected DIB header: ' +
-                f'expected type BITMAPV3INFOHEADER (size=56), got size={header_size}')
+                f'expected type BITMAPV3INFOHEADER (size=56), got size={self.header.header_size}')
 
-        bits_per_pixel = convert_little_endian_hex_to_decimal(self.bits_per_pixel)
-        if not 32 == bits_per_pixel:
+        if not 32 == self.header.bits_per_pixel:
             raise RuntimeError('Wrong number of bits per pixel: ' +
-                f'expected type 32, got {bits_per_pixel}')
+                f'expected type 32, got {self.header.bits_per_pixel}')
+
+        # Expected pixel array offset for ARGB8888 is 70 (no gap).
+        if self.header.offset_pixel_array < HEADER_SIZE:
+            raise RuntimeError(f'Invalid pixel array offset: {self.header.offset_pixel_array}')
+
+        # Size of gap (in case pixel array offset is more than 70).
+        self.gap_size = self.header.offset_pixel_array - HEADER_SIZE
+
+    def _transform_headers(self, transform, top_down):
+        '''
+        Update headers for transformed pixel data (image size, row order, resolution,
+        file size).
+        '''
+        (width, height) = transform_size(self._source[0], self._source[1], transform)
+        (x_ppm, y_ppm) = (self.header.x_pixels_per_meter, self.header.y_pixels_per_meter)
+        if transform in ROTATIONS_90:
+            (x_ppm, y_ppm) = (y_ppm, x_ppm)
+
+        image_size = 4 * width * height
+        self.header = self.header._replace(
+            file_size = self.header.offset_pixel_array + image_size,
+            image_width = width,
+            image_height = -height if top_down else height,
+            image_size = image_size,
+            x_pixels_per_meter = x_ppm,
+            y_pixels_per_meter = y_ppm,
+        )
+        self.header_bytes = HEADER_STRUCT.pack(*self.header)
+
+    @cached_property
+    def _data(self):
+        '''
+        Content of the bitmap file (either read or memory-mapped).
+        '''
+        with stage('read', self.file_name, self.file_name.stat().st_size), open(self.file_name, 'rb') as file:
+            if self.use_mmap:
+                data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+            else:
+                data = file.read()
+
+        return memoryview(data)
+
+    @cached_property
+    def pixel_data(self):
+        '''
+        Pixel array (memoryview, without copying unless transformed).
+        '''
+        data = self._data[self.header.offset_pixel_array:]
+        if self._source is None:
+            return data
+
+        (width, height, top_down) = self._source
+        with stage('transform', self.file_name, len(data)):
+            return memoryview(transform_pixels(data, width, height, self.transform, top_down, self.header.image_height < 0))
+
+    def info(self):
+        '''
+        Retrieve metadata of the bitmap (from the headers and the file size) as dict.
+        '''
+        return dict(
+            file = str(self.file_name),
+            file_size = self.file_name.stat().st_size,
+            width = self.header.image_width,
+            height = abs(self.header.image_height),
+            top_down = self.header.image_height < 0,
+            offset_pixel_array = self.header.offset_pixel_array,
+            gap_size = self.gap_size,
+            image_size = self.header.image_size,
+            compression = self.header.compression,
+            x_pixels_per_meter = self.header.x_pixels_per_meter,
+            y_pixels_per_meter = self.header.y_pixels_per_meter,
+        )
+
+    @cached_property
+    def gap(self):
+        '''
+        Gap between DIB header and pixel array (compatibility, hexadecimal digits).
+        '''
+        return '00' * self.gap_size
 
-        # Get (decimal) value for pixel array offset. Expected pixel array offset for ARGB8888 is 70 (no gap).
-        offset_pixel_array = convert_little_endian_hex_to_decimal(self.offset_pixel_array)
+    @cached_property
+    def pixel_array(self):
+        '''
+        Pixel array (compatibility, hexadecimal digits).
+        '''
+        return hexlify(self.pixel_data).decode('utf-8').upper()
 
-        # Set gap (in case pixel array offset is more than 70).
-        self.gap = '00' * (offset_pixel_array - 70)
+def _hex_header_field(name):
+    # Lazily convert raw bytes of header field to string of hexadecimal digits.
+    field_slice = HEADER_FIELD_SLICES[name]
+    return property(
+        lambda self: hexlify(self.header_bytes[field_slice]).decode('utf-8').upper(),
+        doc = f'Header field {name} (compatibility, hexadecimal digits).'
+        )
 
-        # Retrieve pixel array.
-        self.pixel_array = hexData[2*offset_pixel_array:]
+# Add compatibility attributes for all header fields.
+for (name, _) in HEADER_FIELDS:
+    setattr(BitmapARGB8888, name, _hex_header_field(name))
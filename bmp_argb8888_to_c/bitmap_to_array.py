@@ -1,66 +1,377 @@
-from bmp_argb8888_to_c.bitmap_argb8888 import BitmapARGB8888
-from bmp_argb8888_to_c.template import ARRAY_TEMPLATE
+from bmp_argb8888_to_c.bitmap_argb8888 import BitmapARGB8888, HEADER_FIELDS, HEADER_FIELD_SLICES
+from bmp_argb8888_to_c.compress import COMPRESSION_METHODS, compress_rows
+from bmp_argb8888_to_c.instrumentation import stage
+from bmp_argb8888_to_c.pixel_format import PIXEL_FORMATS, convert_pixels, premultiply_alpha
+from bmp_argb8888_to_c.spans import format_span_table, span_fractions, span_table
+from bmp_argb8888_to_c.template import ARRAY_HEADER_TEMPLATE, ARRAY_FOOTER_TEMPLATE
+from bmp_argb8888_to_c.template import PIXEL_ARRAY_HEADER_TEMPLATE, PIXEL_ARRAY_FOOTER_TEMPLATE
+from bmp_argb8888_to_c.template import CLUT_SIZE_DEFINE_TEMPLATE, CLUT_TEMPLATE
+from bmp_argb8888_to_c.template import COMPRESSED_ARRAY_HEADER_TEMPLATE, COMPRESSED_ARRAY_FOOTER_TEMPLATE, DECODER_TEMPLATE
+from bmp_argb8888_to_c.template import TILED_ARRAY_HEADER_TEMPLATE, TILED_ARRAY_FOOTER_TEMPLATE
+from bmp_argb8888_to_c.template import ALIGNED_METADATA_TEMPLATE, BINARY_HEADER_TEMPLATE, PREMULTIPLIED_METADATA_TEMPLATE
+from bmp_argb8888_to_c.tiles import split_tiles
 from bmp_argb8888_to_c.util import *
 
+from io import StringIO
+
+import struct
+
 class BitmapToArray(BitmapARGB8888):
     '''
     Read content of bitmap file in ARGB8888 format and convert to C array.
     '''
 
-    def as_c_array(self):
+    def as_c_array(self, premultiplied = False, spans = False):
+        '''
+        Convert bitmap data to C array (optionally with premultiplied alpha and span
+        table, see `write_c_array`).
+        '''
+        file = StringIO()
+        self.write_c_array(file, premultiplied = premultiplied, spans = spans)
+        return file.getvalue()
+
+    def as_c_array_aligned(self, alignment = 4, row_alignment = None, premultiplied = False, spans = False):
+        '''
+        Convert bitmap data to C array with 4-byte memory aligned pixel array.
+
+        For ARGB8888, the default offset of the pixel array is 70. Therefore, even if
+        the start of the overall bitmap data is 4-byte aligned in memory, the start of
+        the pixel array is not. One solution to this problem is to add a gap of 2 bytes
+        between the DIB header and the pixel array when converting the bitmap.
+
+        Optionally, a larger alignment (power of two, e.g., 32 bytes for the cache lines
+        of a Cortex-M7) can be used for both the array and the pixel array, and each row
+        can be padded to a multiple of `row_alignment` bytes (e.g., for DMA bursts). In
+        this case, the alignment, the pixel array offset and the stride (bytes per row)
+        are given as preprocessor macros.
+        '''
+        file = StringIO()
+        self.write_c_array(file, aligned = True, alignment = alignment, row_alignment = row_alignment,
+            premultiplied = premultiplied, spans = spans)
+        return file.getvalue()
+
+    def write_c_array(self, file, aligned = False, alignment = 4, row_alignment = None, premultiplied = False,
+            spans = False):
+        '''
+        Convert bitmap data to C array and write it to a file-like object.
+
+        The pixel array is written chunk by chunk. In combination with a memory-mapped
+        bitmap file (see parameter `use_mmap`), the memory usage does not depend on the
+        size of the bitmap. If `aligned` is true, the pixel array is memory aligned
+        (see `as_c_array_aligned`).
+
+        If `premultiplied` is true, the color channels are premultiplied by alpha (see
+        function `premultiply_alpha`), which is indicated by a preprocessor macro. The
+        bitmap headers are not changed.
+
+        If `spans` is true, a table with the spans of fully transparent, fully opaque
+        and semi-transparent pixels of each row is added (see function `span_table`),
+        so that a renderer can skip, copy or blend whole spans. In this case, a dict
+        with the fraction of pixels of each kind is returned.
+        '''
+        if aligned:
+            (header_bytes, gap_size, stride) = self._aligned_headers(alignment, row_alignment)
+            pixel_data = self._padded_pixel_data(stride)
+        else:
+            (header_bytes, gap_size, stride) = (self.header_bytes, self.gap_size, None)
+            pixel_data = self.pixel_data
+
+        if premultiplied:
+            with stage('transform', self.file_name, len(pixel_data)):
+                pixel_data = premultiply_alpha(pixel_data)
+
+        template_fields = self._template_fields(header_bytes, gap_size)
+        metadata = self._aligned_metadata(header_bytes, alignment, row_alignment, stride) if aligned else ''
+        if premultiplied:
+            metadata += PREMULTIPLIED_METADATA_TEMPLATE.format(upper_name = template_fields['name'].upper())
+        template_fields.update(
+            alignment = alignment if aligned else 4,
+            metadata = metadata + '\n' if metadata else '',
+            spans = '',
+        )
+
+        if spans:
+            with stage('transform', self.file_name, len(self.pixel_data)):
+                table = span_table(self.pixel_data[3::4], self.header.image_width, abs(self.header.image_height))
+            template_fields.update(spans = format_span_table(template_fields['name'], table, self._row_order()))
+
+        with stage('emit', self.file_name, len(pixel_data)):
+            file.write(ARRAY_HEADER_TEMPLATE.format(**template_fields))
+            write_c_array_rows(file, pixel_data)
+            file.write(ARRAY_FOOTER_TEMPLATE.format(**template_fields))
+
+        if spans:
+            return span_fractions(table)
+
+    def as_c_pixel_array(self, pixel_format = 'ARGB8888', max_colors = 256, quantizer = 'median-cut'):
         '''
-        Convert bitmap data to C array.
+        Convert pixel array to the given pixel format (see function `convert_pixels`)
+        and return it as C array (without bitmap headers).
         '''
+        file = StringIO()
+        self.write_c_pixel_array(file, pixel_format, max_colors, quantizer)
+        return file.getvalue()
+
+    def write_c_pixel_array(self, file, pixel_format = 'ARGB8888', max_colors = 256, quantizer = 'median-cut'):
+        '''
+        Convert pixel array to the given pixel format (see function `convert_pixels`)
+        and write it as C array (without bitmap headers) to a file-like object.
+
+        Instead of the bitmap headers, the image size, the pixel format (color mode of
+        the LTDC/DMA2D) and the stride (bytes per row) are given as preprocessor macros.
+        For format L8, a color lookup table (CLUT) is added.
+        '''
+        with stage('transform', self.file_name, len(self.pixel_data)):
+            (pixels, clut) = convert_pixels(self.pixel_data, pixel_format, max_colors, quantizer)
+
         # Generate C-compliant name from file name.
         name = c_compatible_name(self.file_name.stem)
+        upper_name = name.upper()
 
-        # Define guard expression.
-        guard = 'INCLUDE_{name}_H_'.format(name = name.upper())
+        template_fields = dict(
+            name = name,
+            upper_name = upper_name,
+            guard = 'INCLUDE_{name}_H_'.format(name = upper_name),
+            width = self.header.image_width,
+            height = abs(self.header.image_height),
+            pixel_format = pixel_format,
+            color_mode = PIXEL_FORMATS[pixel_format].color_mode,
+            stride = self.header.image_width * PIXEL_FORMATS[pixel_format].bytes_per_pixel,
+            array_size = len(pixels),
+            row_order = self._row_order(),
+            clut_size_define = '',
+            clut = '',
+        )
 
-        # Get (decimal) value of file size.
-        array_size = convert_little_endian_hex_to_decimal(self.file_size)
+        if clut is not None:
+            template_fields.update(
+                clut_size_define = CLUT_SIZE_DEFINE_TEMPLATE.format(upper_name = upper_name, clut_size = len(clut) // 4),
+                clut = CLUT_TEMPLATE.format(name = name, clut_bytes = len(clut), clut_array = format_c_array_rows(clut, n=16)),
+            )
 
-        # Define function for concatenation.
-        separator = ',{}'.format(ELEMENT_SEPARATOR)
-        convert = lambda x: separator.join(convert_hex_string_to_c_array_elements(x)) + separator
+        with stage('emit', self.file_name, len(pixels)):
+            file.write(PIXEL_ARRAY_HEADER_TEMPLATE.format(**template_fields))
+            write_c_array_rows(file, pixels)
+            file.write(PIXEL_ARRAY_FOOTER_TEMPLATE.format(**template_fields))
+
+    def as_c_compressed_array(self, method = 'rle'):
+        '''
+        Compress pixel array row by row and return it as C array (see `write_c_compressed_array`).
+        '''
+        file = StringIO()
+        self.write_c_compressed_array(file, method)
+        return file.getvalue()
+
+    def write_c_compressed_array(self, file, method = 'rle'):
+        '''
+        Compress pixel array row by row and write it as C array (without bitmap
+        headers) to a file-like object. Returns a dict with the compression ratio.
 
-        return ARRAY_TEMPLATE.format(
+        Supported compression methods are run-length encoding of 32-bit pixels (`rle`)
+        and LZ4 blocks (`lz4`). Each row is compressed on its own and an index with the
+        offset of each row is added, so that any row can be decoded on demand (e.g.,
+        directly into the frame buffer). The C code for decoding is included.
+        '''
+        width = self.header.image_width
+        with stage('transform', self.file_name, len(self.pixel_data)):
+            compressed = compress_rows(self.pixel_data, 4 * width, method)
+        ratio = compressed.raw_size / max(len(compressed.data), 1)
+
+        # Generate C-compliant name from file name.
+        name = c_compatible_name(self.file_name.stem)
+        upper_name = name.upper()
+
+        template_fields = dict(
             name = name,
-            guard = guard,
-            array_size = array_size,
-            signature = convert(self.signature),
-            file_size = convert(self.file_size),
-            reserved = convert(self.reserved),
-            offset_pixel_array = convert(self.offset_pixel_array),
-            header_size = convert(self.header_size),
-            image_width = convert(self.image_width),
-            image_height = convert(self.image_height),
-            num_color_planes = convert(self.num_color_planes),
-            bits_per_pixel = convert(self.bits_per_pixel),
-            compression = convert(self.compression),
-            image_size = convert(self.image_size),
-            x_pixels_per_meter = convert(self.x_pixels_per_meter),
-            y_pixels_per_meter = convert(self.y_pixels_per_meter),
-            color_table = convert(self.color_table),
-            important_color = convert(self.important_color),
-            resolution_units = convert(self.resolution_units),
-            padding = convert(self.padding),
-            fill_direction = convert(self.fill_direction),
-            halftoning_algo = convert(self.halftoning_algo),
-            halftoning_param_1 = convert(self.halftoning_param_1),
-            halftoning_param_2 = convert(self.halftoning_param_2),
-            gap = convert(self.gap),
-            pixel_array = blockify(convert(self.pixel_array)),
+            upper_name = upper_name,
+            guard = 'INCLUDE_{name}_H_'.format(name = upper_name),
+            decoder = DECODER_TEMPLATE.format(),
+            width = width,
+            height = abs(self.header.image_height),
+            stride = 4 * width,
+            method = method,
+            compression_id = COMPRESSION_METHODS[method],
+            raw_size = compressed.raw_size,
+            array_size = len(compressed.data),
+            row_order = self._row_order(),
+            ratio = ratio,
+            row_offsets = format_c_array_values(compressed.row_offsets),
         )
 
-    def as_c_array_aligned(self):
+        with stage('emit', self.file_name, len(compressed.data)):
+            file.write(COMPRESSED_ARRAY_HEADER_TEMPLATE.format(**template_fields))
+            write_c_array_rows(file, compressed.data)
+            file.write(COMPRESSED_ARRAY_FOOTER_TEMPLATE.format(**template_fields))
+
+        return dict(compression_ratio = ratio)
+
+    def as_c_tiled_array(self, tile_size = 16):
         '''
-        Convert bitmap data to C array with 4-byte memory aligned pixel array.
-        
-        For ARGB8888, the default offset of the pixel array is 70. Therefore, even if
-        the start of the overall bitmap data is 4-byte aligned in memory, the start of
-        the pixel array is not. One solution to this problem is to add a gap of 2 bytes
-        between the DIB header and the pixel array when converting the bitmap.
+        Split pixel array into tiles and return unique tiles and tile map as C arrays
+        (see `write_c_tiled_array`).
+        '''
+        file = StringIO()
+        self.write_c_tiled_array(file, tile_size)
+        return file.getvalue()
+
+    def write_c_tiled_array(self, file, tile_size = 16):
+        '''
+        Split pixel array into square tiles, store identical tiles only once and write
+        the unique tiles and the tile map as C arrays (without bitmap headers) to a
+        file-like object. Returns a dict with the number of unique tiles and the dedup
+        ratio (number of tiles per unique tile).
+
+        Each tile is stored contiguously (rows from top to bottom), so that it can be
+        copied with a single DMA2D transfer. The tile map contains the index of the
+        unique tile for each tile position, which gives constant-time access to any tile.
+        '''
+        width = self.header.image_width
+        height = abs(self.header.image_height)
+        with stage('transform', self.file_name, len(self.pixel_data)):
+            tiled = split_tiles(self.pixel_data, width, height, tile_size, top_down = self.header.image_height < 0)
+
+        tile_bytes = 4 * tile_size * tile_size
+        tile_count = len(tiled.tiles) // tile_bytes
+        ratio = len(tiled.tile_map) / max(tile_count, 1)
+
+        # Generate C-compliant name from file name.
+        name = c_compatible_name(self.file_name.stem)
+        upper_name = name.upper()
+
+        template_fields = dict(
+            name = name,
+            upper_name = upper_name,
+            guard = 'INCLUDE_{name}_H_'.format(name = upper_name),
+            width = width,
+            height = height,
+            tile_size = tile_size,
+            tile_stride = 4 * tile_size,
+            tile_bytes = tile_bytes,
+            tiles_x = tiled.tiles_x,
+            tiles_y = tiled.tiles_y,
+            tile_count = tile_count,
+            ratio = ratio,
+            array_size = len(tiled.tiles),
+            map_type = 'uint16_t' if tile_count <= 0x10000 else 'uint32_t',
+            tile_map = format_c_array_values(tiled.tile_map, n=min(tiled.tiles_x, 32)),
+        )
+
+        with stage('emit', self.file_name, len(tiled.tiles)):
+            file.write(TILED_ARRAY_HEADER_TEMPLATE.format(**template_fields))
+            write_c_array_rows(file, tiled.tiles)
+            file.write(TILED_ARRAY_FOOTER_TEMPLATE.format(**template_fields))
+
+        return dict(unique_tiles = tile_count, dedup_ratio = ratio)
+
+    def as_binary(self, alignment = 4, row_alignment = None):
+        '''
+        Retrieve bitmap data with memory aligned pixel array as bytes (same layout as
+        `as_c_array_aligned`, i.e., headers, gap and pixel array).
+        '''
+        (header_bytes, gap_size, stride) = self._aligned_headers(alignment, row_alignment)
+        return b''.join([header_bytes, bytes(gap_size), self._padded_pixel_data(stride)])
+
+    def write_binary(self, file, alignment = 4, row_alignment = None):
+        '''
+        Write bitmap data with memory aligned pixel array to a binary file-like object
+        (same layout as `as_binary`). Without row padding, the pixel array is not copied.
+        '''
+        (header_bytes, gap_size, stride) = self._aligned_headers(alignment, row_alignment)
+        pixel_data = self._padded_pixel_data(stride)
+        with stage('emit', self.file_name, len(header_bytes) + gap_size + len(pixel_data)):
+            file.write(header_bytes)
+            file.write(bytes(gap_size))
+            file.write(pixel_data)
+
+    def as_c_binary_header(self, alignment = 4, row_alignment = None):
+        '''
+        Generate C header with declarations for the binary data (see `as_binary`),
+        which is linked from an object file instead of being compiled from a C array.
+        '''
+        (header_bytes, _, stride) = self._aligned_headers(alignment, row_alignment)
+
+        # Generate C-compliant name from file name.
+        name = c_compatible_name(self.file_name.stem)
+
+        return BINARY_HEADER_TEMPLATE.format(
+            name = name,
+            upper_name = name.upper(),
+            guard = 'INCLUDE_{name}_H_'.format(name = name.upper()),
+            array_size = struct.unpack_from('<I', header_bytes, HEADER_FIELD_SLICES['file_size'].start)[0],
+            alignment = alignment,
+            metadata = self._aligned_metadata(header_bytes, alignment, row_alignment, stride),
+        )
+
+    def _aligned_headers(self, alignment = 4, row_alignment = None):
+        '''
+        Retrieve (raw) header bytes, gap size and stride (bytes per row) for memory
+        aligned pixel array, optionally with each row padded to a multiple of
+        `row_alignment` bytes.
+        '''
+        check_alignment(alignment)
+        if row_alignment is not None:
+            check_alignment(row_alignment)
+
+        # Add a gap so that the pixel array is memory aligned.
+        offset = self.header.offset_pixel_array
+        delta = -offset % alignment
+
+        # Pad rows to a multiple of the row alignment.
+        width = self.header.image_width
+        height = abs(self.header.image_height)
+        stride = 4 * width
+        if row_alignment is not None:
+            stride += -stride % row_alignment
+        padding = (stride - 4 * width) * height
+
+        # Update file size, pixel array offset and image size in the headers.
+        header_bytes = bytearray(self.header_bytes)
+        struct.pack_into('<I', header_bytes, HEADER_FIELD_SLICES['file_size'].start, self.header.file_size + delta + padding)
+        struct.pack_into('<I', header_bytes, HEADER_FIELD_SLICES['offset_pixel_array'].start, offset + delta)
+        if padding:
+            struct.pack_into('<I', header_bytes, HEADER_FIELD_SLICES['image_size'].start, stride * height)
+
+        return (header_bytes, self.gap_size + delta, stride)
+
+    def _padded_pixel_data(self, stride):
+        '''
+        Retrieve pixel array with each row padded to the given stride (bytes per row).
+        '''
+        row_size = 4 * self.header.image_width
+        if stride == row_size:
+            return self.pixel_data
+
+        pad = bytes(stride - row_size)
+        data = self.pixel_data
+        return b''.join(
+            data[start:start + row_size].tobytes() + pad for start in range(0, len(data), row_size)
+            )
+
+    def _aligned_metadata(self, header_bytes, alignment, row_alignment, stride):
+        '''
+        Retrieve preprocessor macros with alignment, pixel array offset and stride
+        (only for custom alignment or row padding, empty otherwise).
+        '''
+        if alignment == 4 and row_alignment is None:
+            return ''
+
+        name = c_compatible_name(self.file_name.stem)
+        return ALIGNED_METADATA_TEMPLATE.format(
+            upper_name = name.upper(),
+            alignment = alignment,
+            pixel_offset = struct.unpack_from('<I', header_bytes, HEADER_FIELD_SLICES['offset_pixel_array'].start)[0],
+            stride = stride,
+        )
+
+    def _row_order(self):
+        '''
+        Retrieve row order of the pixel array (for comments in the generated code).
+        '''
+        return 'top to bottom' if self.header.image_height < 0 else 'bottom to top'
+
+    def _template_fields(self, header_bytes, gap_size):
+        '''
+        Retrieve fields for array template from (raw) header bytes and gap size.
         '''
         # Generate C-compliant name from file name.
         name = c_compatible_name(self.file_name.stem)
@@ -69,46 +380,19 @@ class BitmapToArray(BitmapARGB8888):
         guard = 'INCLUDE_{name}_H_'.format(name = name.upper())
 
         # Get (decimal) value of file size.
-        array_size = convert_little_endian_hex_to_decimal(self.file_size)
-
-        # Add a gap so that the pixel array is 4-byte memory aligned.
-        offset = convert_little_endian_hex_to_decimal(self.offset_pixel_array)
-        delta = offset % 4
-        new_gap = self.gap + '00' * delta
-        new_offset_pixel_array = convert_decimal_to_little_endian_hex(offset + delta)
-        new_array_size = array_size + delta
-        new_file_size = convert_decimal_to_little_endian_hex(new_array_size)
+        array_size = struct.unpack_from('<I', header_bytes, HEADER_FIELD_SLICES['file_size'].start)[0]
 
-        # Define function for concatenation.
-        separator = ',{}'.format(ELEMENT_SEPARATOR)
-        convert = lambda x: separator.join(convert_hex_string_to_c_array_elements(x)) + separator
+        # Convert each header field to C array elements.
+        template_fields = {
+            field: format_c_array_elements(header_bytes[HEADER_FIELD_SLICES[field]])
+            for (field, _) in HEADER_FIELDS
+            }
 
-        return ARRAY_TEMPLATE.format(
+        template_fields.update(
             name = name,
             guard = guard,
-            array_size = new_array_size,
-            signature = convert(self.signature),
-            file_size = convert(new_file_size),
-            reserved = convert(self.reserved),
-            offset_pixel_array = convert(new_offset_pixel_array),
-            header_size = convert(self.header_size),
-            image_width = convert(self.image_width),
-            image_height = convert(self.image_height),
-            num_color_planes = convert(self.num_color_planes),
-            bits_per_pixel = convert(self.bits_per_pixel),
-            compression = convert(self.compression),
-            image_size = convert(self.image_size),
-            x_pixels_per_meter = convert(self.x_pixels_per_meter),
-            y_pixels_per_meter = convert(self.y_pixels_per_meter),
-            color_table = convert(self.color_table),
-            important_color = convert(self.important_color),
-            resolution_units = convert(self.resolution_units),
-            padding = convert(self.padding),
-            fill_direction = convert(self.fill_direction),
-            halftoning_algo = convert(self.halftoning_algo),
-            halftoning_param_1 = convert(self.halftoning_param_1),
-            halftoning_param_2 = convert(self.halftoning_param_2),
-            gap = convert(new_gap),
-            pixel_array = blockify(convert(self.pixel_array)),
+            array_size = array_size,
+            gap = format_c_array_elements(bytes(gap_size)),
         )
 
+        return template_fields
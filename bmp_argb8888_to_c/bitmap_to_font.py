@@ -1,7 +1,24 @@
+from bmp_argb8888_to_c.alpha import ALPHA_BITS_PER_PIXEL, alpha_row_size, crop_alpha, quantize_alpha, pack_alpha
 from bmp_argb8888_to_c.bitmap_argb8888 import BitmapARGB8888
-from bmp_argb8888_to_c.template import FONT_ARRAY_TEMPLATE, SINGLE_FONT_TEMPLATE
+from bmp_argb8888_to_c.instrumentation import stage
+from bmp_argb8888_to_c.spans import format_span_table, span_fractions, span_table
+from bmp_argb8888_to_c.template import FONT_ARRAY_HEADER_TEMPLATE, FONT_ARRAY_FOOTER_TEMPLATE, SINGLE_FONT_TEMPLATE
+from bmp_argb8888_to_c.template import COMPACT_FONT_ARRAY_HEADER_TEMPLATE, COMPACT_FONT_ARRAY_FOOTER_TEMPLATE, SINGLE_COMPACT_FONT_TEMPLATE
+from bmp_argb8888_to_c.transform import check_transform, transform_pixels, transform_size
 from bmp_argb8888_to_c.util import *
 
+from collections import namedtuple
+from io import StringIO
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Glyph of a compact font: offset of the cropped glyph in the table and its bounding
+# box within the glyph cell.
+Glyph = namedtuple('Glyph', ['offset', 'x', 'y', 'width', 'height'])
+
 class BitmapToFont(BitmapARGB8888):
     '''
     Read content of a bitmap file in ARGB8888 format and convert it to a C array for 
@@ -12,68 +29,244 @@ class BitmapToFont(BitmapARGB8888):
     creating anit-aliased fonts on a screen.
     
     The expected input is a bitmap with all the fonts in a single row (in ASCII-order).
+
+    By default, the transparency information is stored with 8 bits per pixel. To
+    reduce the size of the array, it can be quantized to 4, 2 or 1 bit(s) per pixel
+    (optionally with dithering). Each row of a font starts at a byte boundary.
+
+    In compact mode, each glyph is cropped to the bounding box of its non-transparent
+    pixels and identical glyphs are stored only once. A table with the offset and
+    bounding box of each glyph is added.
+
+    Optionally, each glyph is transformed (flipped or rotated, see `TRANSFORMS`),
+    e.g., for portrait-mounted displays. For rotations by 90 or 270 degrees, the font
+    width and height are swapped.
+
+    Optionally (not in compact mode), a table with the spans of fully transparent,
+    fully opaque and semi-transparent pixels of each row of each glyph is added.
     '''
 
-    def __init__(self, file_name, font_height, font_width):
+    def __init__(self, file_name, font_height, font_width, bpp = 8, dither = False, compact = False, transform = None,
+            spans = False):
         super().__init__(file_name)
 
+        check_transform(transform)
+
+        if bpp not in ALPHA_BITS_PER_PIXEL:
+            raise RuntimeError(f'Unsupported number of bits per pixel ({bpp}), expected one of {ALPHA_BITS_PER_PIXEL}.')
+
         # Sanity check.
-        line_width = convert_little_endian_hex_to_decimal(self.image_width)
+        line_width = self.header.image_width
         if not 0 == line_width % font_width:
             raise RuntimeError(f'Image width ({line_width}) must be a multiple of font with ({font_width}).')
 
-        image_height = convert_little_endian_hex_to_decimal(self.image_height)
+        # A negative image height indicates a top-down bitmap.
+        image_height = abs(self.header.image_height)
         if not image_height == font_height:
             raise RuntimeError(f'Image height ({image_height}) must be same as font height ({font_height}).')
 
+        self.top_down = self.header.image_height < 0
         self.line_width = line_width
-        self.font_height = font_height
-        self.font_width = font_width
         self.n_fonts = int(line_width / font_width)
+        self.transform = transform
+        # Size of the (transformed) glyphs.
+        (self.font_width, self.font_height) = transform_size(font_width, font_height, transform)
+        self.bpp = bpp
+        self.dither = dither
+        self.compact = compact
+        self.spans = spans
+
+        if compact and not (font_width < 256 and font_height < 256):
+            raise RuntimeError('Font width and height must be less than 256 for compact fonts.')
+
+        if compact and spans:
+            raise RuntimeError('Span tables are not supported for compact fonts.')
 
     def as_c_font(self):
         '''
         Convert bitmap data to C array for anti-aliased fonts.
         '''
-        # Extract all bytes with transparency information (every 4th
-        # byte) in the order they appear in the pixel array, i.e.,
+        file = StringIO()
+        self.write_c_font(file)
+        return file.getvalue()
+
+    def font_alpha(self):
+        '''
+        Extract transparency information of all fonts, i.e., a block of shape
+        (number of fonts, font height, font width). For each font, the order is
+        from top left to bottom right (after the transform, if any).
+
+        Uses NumPy if available, otherwise strided slicing of the pixel array.
+        '''
+        alpha = self._glyph_alpha()
+        if self.transform is None:
+            return alpha
+
+        # Size of the glyphs in the glyph sheet.
+        (w, h) = transform_size(self.font_width, self.font_height, self.transform)
+        size = w * h
+        return b''.join(
+            transform_pixels(alpha[i * size:(i + 1) * size], w, h, self.transform, True, True, 1)
+            for i in range(self.n_fonts)
+            )
+
+    def _glyph_alpha(self):
+        '''
+        Extract transparency information of all fonts as in the glyph sheet (see `font_alpha`).
+        '''
+        (n, h) = (self.n_fonts, abs(self.header.image_height))
+        w = self.line_width // n
+
+        # Extract all bytes with transparency information (every 4th byte)
+        # in the order they appear in the pixel array, i.e., (by default)
         # from bottom left to top right (image containing all fonts).
-        transparency = convert_hex_string_to_c_array_elements(self.pixel_array)[3::4]
-
-        # Create empty list for each font.
-        fonts = [[] for _ in range(self.n_fonts)]
-
-        # Extract transparency information in correct order for each
-        # individual font. Resulting order will be from top left to 
-        # bottom right (for each font).
-        for line in reversed(range(self.font_height)):
-            for i in range(self.n_fonts):
-                start = line * self.line_width + i * self.font_width
-                stop = start + self.font_width
-                fonts[i].extend(transparency[start:stop])
-
-        # Define function for concatenation.
-        separator = ',{}'.format(ELEMENT_SEPARATOR)
-        convert = lambda x: blockify(separator.join(x), n=self.font_width) + separator
-
-        # Generate C sub-array for each font.
-        single_font_arrays = [
-            SINGLE_FONT_TEMPLATE.format(
-                font_data = convert(f), pos = i * self.font_width * self.font_height
-                ) for (i, f) in enumerate(fonts)
+        if numpy is not None:
+            alpha = numpy.frombuffer(self.pixel_data, dtype = numpy.uint8)[3::4].reshape(h, n, w)
+            if not self.top_down:
+                alpha = alpha[::-1]
+            return alpha.transpose(1, 0, 2).tobytes()
+
+        alpha = bytes(self.pixel_data[3::4])
+        lines = range(h) if self.top_down else reversed(range(h))
+        starts = [line * self.line_width for line in lines]
+        return b''.join([
+            alpha[start + i * w:start + (i + 1) * w] for i in range(n) for start in starts
+            ])
+
+    def font_levels(self, indices = None):
+        '''
+        Retrieve quantized transparency information of each font (list of byte strings,
+        one level per byte). Optionally, only the fonts with the given indices are
+        retrieved (in the given order).
+        '''
+        alpha = self.font_alpha()
+        font_size = self.font_width * self.font_height
+        return [
+            quantize_alpha(alpha[i*font_size:(i+1)*font_size], self.font_width, self.font_height, self.bpp, self.dither)
+            for i in (range(self.n_fonts) if indices is None else indices)
+            ]
+
+    def font_data(self, indices = None):
+        '''
+        Retrieve transparency information of each font (list of byte strings), with
+        the configured number of bits per pixel. Optionally, only the fonts with the
+        given indices are retrieved (in the given order).
+        '''
+        return [
+            pack_alpha(levels, self.font_width, self.font_height, self.bpp) for levels in self.font_levels(indices)
             ]
-        
+
+    def compact_font_data(self):
+        '''
+        Retrieve transparency information of all glyphs, cropped to their bounding box
+        and with identical glyphs stored only once. Returns the concatenated glyph data
+        and a list with a `Glyph` for each font.
+        '''
+        alpha = self.font_alpha()
+        font_size = self.font_width * self.font_height
+
+        table = bytearray()
+        offsets = {}
+        glyphs = []
+        for i in range(self.n_fonts):
+            levels = quantize_alpha(alpha[i*font_size:(i+1)*font_size], self.font_width, self.font_height, self.bpp, self.dither)
+            ((x, y, width, height), cropped) = crop_alpha(levels, self.font_width, self.font_height)
+            data = pack_alpha(cropped, width, height, self.bpp)
+
+            # Identical glyphs (same size and data) share the same offset.
+            key = (width, height, data)
+            if key not in offsets:
+                offsets[key] = len(table)
+                table.extend(data)
+            glyphs.append(Glyph(offsets[key], x, y, width, height))
+
+        return (bytes(table), glyphs)
+
+    def write_c_font(self, file):
+        '''
+        Convert bitmap data to C array for anti-aliased fonts and write it to a file-like object.
+        In compact mode, returns a dict with the number of unique glyphs and the table size.
+        With span table, returns a dict with the fraction of pixels of each kind.
+        '''
+        if self.compact:
+            return self._write_c_compact_font(file)
+
+        # Transparency information for each font.
+        with stage('transform', self.file_name, len(self.pixel_data)):
+            levels = self.font_levels()
+            fonts = [pack_alpha(l, self.font_width, self.font_height, self.bpp) for l in levels]
+            if self.spans:
+                # Rows of all glyphs (glyph by glyph).
+                table = span_table(b''.join(levels), self.font_width, self.n_fonts * self.font_height, (1 << self.bpp) - 1)
+
+        # Define function for concatenation (one row of a font per line).
+        row_size = alpha_row_size(self.font_width, self.bpp)
+        convert = lambda x: format_c_array_rows(x, n=row_size) + ELEMENT_SEPARATOR
+
         # Generate C-compliant name from file name.
         name = c_compatible_name(self.file_name.stem)
 
         # Define guard expression.
         guard = 'INCLUDE_{name}_H_'.format(name = name.upper())
 
-        # Generate C array for complete collection of fonts.
-        return FONT_ARRAY_TEMPLATE.format(
+        template_fields = dict(
             name = name,
             font_width = self.font_width,
             font_heigth = self.font_height,
-            fonts_array = ''.join(single_font_arrays),
+            bpp = self.bpp,
             guard = guard,
         )
+
+        # Write C array for complete collection of fonts, with a C sub-array for each font.
+        with stage('emit', self.file_name, sum(map(len, fonts))):
+            file.write(FONT_ARRAY_HEADER_TEMPLATE.format(**template_fields))
+            for (i, f) in enumerate(fonts):
+                file.write(SINGLE_FONT_TEMPLATE.format(
+                    font_data = convert(f), pos = i * row_size * self.font_height
+                    ))
+            file.write(FONT_ARRAY_FOOTER_TEMPLATE.format(**template_fields))
+            if self.spans:
+                file.write('\n' + format_span_table(name, table, 'top to bottom, glyph by glyph'))
+
+        if self.spans:
+            return span_fractions(table)
+
+    def _write_c_compact_font(self, file):
+        '''
+        Convert bitmap data to C array for compact anti-aliased fonts and write it to a file-like object.
+        '''
+        with stage('transform', self.file_name, len(self.pixel_data)):
+            (table, glyphs) = self.compact_font_data()
+
+        # Generate C-compliant name from file name.
+        name = c_compatible_name(self.file_name.stem)
+
+        template_fields = dict(
+            name = name,
+            font_width = self.font_width,
+            font_heigth = self.font_height,
+            bpp = self.bpp,
+            count = len(glyphs),
+            glyphs = TEMPLATE_LINE_SEPARATOR.join(
+                f'{{ {g.offset}, {g.x}, {g.y}, {g.width}, {g.height} }}, // {i}' for (i, g) in enumerate(glyphs)
+                ),
+        )
+
+        # Glyphs sharing the same data (ignoring empty glyphs), ordered by offset.
+        shared = {}
+        for (i, g) in enumerate(glyphs):
+            if g.width:
+                shared.setdefault(g.offset, (g, []))[1].append(str(i))
+
+        with stage('emit', self.file_name, len(table)):
+            file.write(COMPACT_FONT_ARRAY_HEADER_TEMPLATE.format(**template_fields))
+            for (offset, (g, indices)) in sorted(shared.items()):
+                row_size = alpha_row_size(g.width, self.bpp)
+                data = table[offset:offset + row_size * g.height]
+                file.write(SINGLE_COMPACT_FONT_TEMPLATE.format(
+                    font_data = format_c_array_rows(data, n=row_size) + ELEMENT_SEPARATOR,
+                    pos = offset, glyph_indices = ', '.join(indices)
+                    ))
+            file.write(COMPACT_FONT_ARRAY_FOOTER_TEMPLATE.format(**template_fields))
+
+        return dict(unique_glyphs = len(shared), table_size = len(table))
@@ -0,0 +1,131 @@
+from bmp_argb8888_to_c.bitmap_to_array import BitmapToArray
+from bmp_argb8888_to_c.bitmap_to_font import BitmapToFont
+from bmp_argb8888_to_c.pixel_format import PIXEL_FORMATS, convert_pixels
+from bmp_argb8888_to_c.template import BUNDLE_HEADER_TEMPLATE
+from bmp_argb8888_to_c.util import c_compatible_name, check_alignment
+
+from collections import namedtuple
+
+import struct
+
+# Asset of a bundle, with the number of glyphs for fonts (1 otherwise).
+BundleAsset = namedtuple('BundleAsset', ['name', 'data', 'width', 'height', 'format', 'count'])
+
+# Entry of the index table of a bundle.
+BundleEntry = namedtuple('BundleEntry', ['offset', 'size', 'width', 'height', 'format', 'count'])
+
+# Asset formats: pixel formats (color modes of the LTDC/DMA2D) and alpha masks
+# of fonts (A8 and A4 as for the DMA2D, A2 and A1 not supported by the DMA2D).
+ASSET_FORMATS = dict(
+    {f.name: f.color_mode for f in PIXEL_FORMATS.values()},
+    A8 = 9,
+    A4 = 10,
+    A2 = 11,
+    A1 = 12,
+)
+
+# Bundle header (magic, version, number of assets, alignment) and index table entry
+# (offset, size, width, height, format, reserved, count), see BUNDLE_HEADER_TEMPLATE.
+BUNDLE_MAGIC = b'BMPB'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<4sHHI')
+BUNDLE_ENTRY = struct.Struct('<IIHHBBH')
+
+def bitmap_assets(file_name, pixel_format = 'ARGB8888', max_colors = 256, quantizer = 'median-cut'):
+    '''
+    Create bundle assets for a bitmap file: the pixel array in the given pixel format
+    (see function `convert_pixels`) and, for format L8, the color lookup table (named
+    `<name>_clut`, ARGB8888, width is the number of colors).
+    '''
+    bmp = BitmapToArray(file_name, use_mmap = True)
+    name = c_compatible_name(bmp.file_name.stem)
+    (width, height) = (bmp.header.image_width, abs(bmp.header.image_height))
+
+    (pixels, clut) = convert_pixels(bmp.pixel_data, pixel_format, max_colors, quantizer)
+
+    assets = [BundleAsset(name, pixels, width, height, pixel_format, 1)]
+    if clut is not None:
+        assets.append(BundleAsset(f'{name}_clut', clut, len(clut) // 4, 1, 'ARGB8888', 1))
+
+    return assets
+
+def font_asset(file_name, font_height, font_width, bpp = 8, dither = False):
+    '''
+    Create bundle asset for a font bitmap file (see class `BitmapToFont`). The width
+    and height are those of a single glyph.
+    '''
+    font = BitmapToFont(file_name, font_height, font_width, bpp, dither)
+    name = c_compatible_name(font.file_name.stem)
+    return BundleAsset(name, b''.join(font.font_data()), font_width, font_height, f'A{bpp}', font.n_fonts)
+
+def bundle_layout(assets, alignment = 4):
+    '''
+    Compute the layout of a bundle. Returns the index table (list of `BundleEntry`)
+    and the total size of the bundle.
+
+    The bundle starts with the header and the index table, followed by the data of
+    all assets, each one starting at a multiple of `alignment` (e.g., 4 bytes for the
+    DMA2D, 32 or 64 bytes for cache lines).
+    '''
+    check_alignment(alignment)
+
+    names = [asset.name for asset in assets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise RuntimeError(f'Duplicate asset names: {", ".join(duplicates)}')
+
+    entries = []
+    offset = BUNDLE_HEADER.size + len(assets) * BUNDLE_ENTRY.size
+    for asset in assets:
+        if not (asset.width < 0x10000 and asset.height < 0x10000 and asset.count < 0x10000):
+            raise RuntimeError(f'Asset {asset.name} is too large ({asset.width}x{asset.height}).')
+        if asset.format not in ASSET_FORMATS:
+            raise RuntimeError(f'Unknown asset format: {asset.format}')
+        offset += -offset % alignment
+        entries.append(BundleEntry(offset, len(asset.data), asset.width, asset.height, asset.format, asset.count))
+        offset += len(asset.data)
+
+    return (entries, offset)
+
+def write_bundle(file, assets, alignment = 4):
+    '''
+    Write bundle (see function `bundle_layout`) to a binary file-like object.
+    Returns the index table (list of `BundleEntry`) and the size of the bundle.
+    '''
+    (entries, size) = bundle_layout(assets, alignment)
+
+    file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(entries), alignment))
+    for entry in entries:
+        file.write(BUNDLE_ENTRY.pack(entry.offset, entry.size, entry.width, entry.height,
+            ASSET_FORMATS[entry.format], 0, entry.count))
+
+    position = BUNDLE_HEADER.size + len(entries) * BUNDLE_ENTRY.size
+    for (asset, entry) in zip(assets, entries):
+        file.write(bytes(entry.offset - position))
+        file.write(asset.data)
+        position = entry.offset + entry.size
+
+    return (entries, size)
+
+def bundle_c_header(name, assets, entries, size, alignment = 4):
+    '''
+    Generate C descriptor of a bundle: types of header and index table, asset
+    formats, and size, alignment and asset IDs of the bundle.
+    '''
+    upper_name = name.upper()
+
+    asset_ids = [
+        f'{upper_name}_{asset.name.upper()} = {i}, // {entry.format}, {entry.width}x{entry.height}' +
+        (f' ({entry.count} glyphs)' if entry.count > 1 else '') + f', {entry.size} bytes at offset {entry.offset}'
+        for (i, (asset, entry)) in enumerate(zip(assets, entries))
+        ]
+
+    return BUNDLE_HEADER_TEMPLATE.format(
+        guard = 'INCLUDE_{name}_H_'.format(name = upper_name),
+        upper_name = upper_name,
+        format_defines = '\n'.join(f'#define BMP_BUNDLE_FORMAT_{f} {v}' for (f, v) in ASSET_FORMATS.items()),
+        bundle_size = size,
+        alignment = alignment,
+        count = len(assets),
+        asset_ids = '\n  '.join(asset_ids),
+    )
@@ -0,0 +1,163 @@
+from bmp_argb8888_to_c import __version__
+from bmp_argb8888_to_c.instrumentation import stage
+from bmp_argb8888_to_c.util import write_atomic
+
+from filecmp import cmp
+from functools import lru_cache
+from pathlib import Path
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# Default maximum number of cache entries.
+DEFAULT_MAX_ENTRIES = 1000
+
+# Default maximum total size of cache entries (in bytes).
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# Size of chunks for hashing input files (in bytes).
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# File extension of the information about the conversion stored with each entry.
+INFO_SUFFIX = '.json'
+
+@lru_cache(maxsize = None)
+def source_digest():
+    '''
+    Compute hash of the source files of the package, which changes whenever the
+    generated output might change (even if the version does not, e.g., during
+    development).
+    '''
+    digest = hashlib.sha256()
+    for source in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(f'{source.name}\0'.encode('utf-8'))
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+def default_cache_dir():
+    '''
+    Retrieve default cache directory (following the XDG base directory specification).
+    '''
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'bmp_argb8888_to_c'
+
+class ConversionCache:
+    '''
+    On-disk cache for generated C code.
+
+    Each entry is keyed by the content hash of the input file, the conversion mode
+    (including its parameters), the tool version and the hash of its sources. When the key of a conversion
+    matches an existing entry, both the conversion and the write of the output file
+    can be skipped (see `restore`). Together with each entry, the information about
+    the conversion (e.g., the compression ratio) is stored, so that it can be reported
+    for cached outputs as well. The least recently used entries are evicted
+    whenever the maximum number of entries or the maximum total size is exceeded.
+    '''
+
+    def __init__(self, directory = None, max_entries = DEFAULT_MAX_ENTRIES, max_size = DEFAULT_MAX_SIZE):
+        self.directory = Path(directory or default_cache_dir())
+        self.max_entries = max_entries
+        self.max_size = max_size
+
+        self.directory.mkdir(parents = True, exist_ok = True)
+
+    def key(self, input_file, mode, **params):
+        '''
+        Compute cache key from content of input file, conversion mode and parameters.
+        '''
+        digest = hashlib.sha256()
+
+        # Tool version and sources, conversion mode and parameters (sorted by name).
+        digest.update(f'{__version__}\0{source_digest()}\0{mode}\0'.encode('utf-8'))
+        for (name, value) in sorted(params.items()):
+            digest.update(f'{name}={value!r}\0'.encode('utf-8'))
+
+        # Content of input file.
+        with stage('hash', input_file, Path(input_file).stat().st_size), open(input_file, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def restore(self, key, out_file):
+        '''
+        Restore output file from cache. Returns the stored information about the
+        conversion (dict, might be empty), or None if there is no entry for the key.
+
+        If the output file already has the cached content, it is not written (to
+        avoid touching its modification time).
+        '''
+        entry = self.directory / key
+
+        if not entry.is_file():
+            return None
+
+        # Mark entry as recently used.
+        try:
+            entry.touch()
+            info = json.loads(entry.with_name(key + INFO_SUFFIX).read_text(encoding = 'utf-8'))
+        except FileNotFoundError:
+            # Entry was evicted concurrently (or has no information).
+            return None
+
+        try:
+            if not (Path(out_file).is_file() and cmp(entry, out_file, shallow = False)):
+                # Write atomically, so that readers never see a partially written output file.
+                with open(entry, 'rb') as src, write_atomic(out_file, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+        except FileNotFoundError:
+            # Entry was evicted concurrently.
+            return None
+
+        return info
+
+    def store(self, key, out_file, info = None):
+        '''
+        Add output file and information about the conversion (dict) to cache and
+        evict old entries if necessary.
+        '''
+        # Write to temporary files first, so that concurrent processes never see incomplete
+        # entries. Information first, so that each visible entry has it.
+        (fd, tmp_name) = tempfile.mkstemp(dir = self.directory, prefix = '.tmp-')
+        with os.fdopen(fd, 'w', encoding = 'utf-8') as file:
+            json.dump(info or {}, file)
+        os.replace(tmp_name, self.directory / (key + INFO_SUFFIX))
+
+        (fd, tmp_name) = tempfile.mkstemp(dir = self.directory, prefix = '.tmp-')
+        os.close(fd)
+        shutil.copyfile(out_file, tmp_name)
+        os.replace(tmp_name, self.directory / key)
+
+        self.evict()
+
+    def evict(self):
+        '''
+        Remove least recently used entries until the cache limits are met.
+        '''
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith('.tmp-') or entry.name.endswith(INFO_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        # Sort entries from most to least recently used.
+        entries.sort(reverse = True)
+
+        (n_entries, total_size) = (0, 0)
+        for (_, size, entry) in entries:
+            if n_entries < self.max_entries and total_size + size <= self.max_size:
+                n_entries += 1
+                total_size += size
+                continue
+            for path in (entry, entry.with_name(entry.name + INFO_SUFFIX)):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
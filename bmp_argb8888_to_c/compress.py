@@ -0,0 +1,143 @@
+from collections import namedtuple
+from itertools import groupby
+
+# Supported compression methods (with identifier used in the generated C code).
+COMPRESSION_METHODS = {
+    'rle': 1,
+    'lz4': 2,
+}
+
+# Compressed pixel array, with offsets of the compressed rows (one more than the
+# number of rows, i.e., row i is stored in data[row_offsets[i]:row_offsets[i+1]]).
+CompressedPixels = namedtuple('CompressedPixels', ['method', 'data', 'row_offsets', 'raw_size'])
+
+# Maximum number of pixels per RLE packet.
+RLE_MAX_COUNT = 128
+
+# LZ4 block format: minimum match length, literals at end of block, last match
+# must start at least this many bytes before the end of the block.
+LZ4_MIN_MATCH = 4
+LZ4_LAST_LITERALS = 5
+LZ4_MF_LIMIT = 12
+LZ4_MAX_OFFSET = 0xFFFF
+
+def rle_encode(row):
+    '''
+    Run-length encode a row of 32-bit pixels.
+
+    The row is encoded as a sequence of packets, each starting with a header byte:
+    - if bit 7 is set, the next pixel (4 bytes) is repeated (header & 0x7F) + 1 times,
+    - otherwise, (header + 1) pixels (4 bytes each) follow literally.
+    '''
+    pixels = [bytes(row[i:i+4]) for i in range(0, len(row), 4)]
+
+    out = bytearray()
+    literals = []
+
+    def flush_literals():
+        for i in range(0, len(literals), RLE_MAX_COUNT):
+            chunk = literals[i:i+RLE_MAX_COUNT]
+            out.append(len(chunk) - 1)
+            out.extend(b''.join(chunk))
+        literals.clear()
+
+    for (pixel, group) in groupby(pixels):
+        count = sum(1 for _ in group)
+        if count == 1:
+            literals.append(pixel)
+            continue
+        flush_literals()
+        while count > 0:
+            n = min(count, RLE_MAX_COUNT)
+            if n == 1:
+                literals.append(pixel)
+            else:
+                out.append(0x80 | (n - 1))
+                out.extend(pixel)
+            count -= n
+
+    flush_literals()
+    return bytes(out)
+
+def _lz4_length(out, length):
+    # Additional length bytes (LZ4 block format).
+    while length >= 255:
+        out.append(255)
+        length -= 255
+    out.append(length)
+
+def lz4_compress(data):
+    '''
+    Compress data to a single LZ4 block (greedy matching).
+
+    Match candidates are only searched at 4-byte (pixel) boundaries, which makes the
+    compression much faster for 32-bit pixel data. The output is a standard LZ4 block
+    that any LZ4 block decoder can decompress.
+    '''
+    data = bytes(data)
+    n = len(data)
+    out = bytearray()
+
+    table = {}
+    anchor = 0
+    pos = 0
+    limit = n - LZ4_MF_LIMIT
+
+    while pos <= limit:
+        key = data[pos:pos+LZ4_MIN_MATCH]
+        candidate = table.get(key)
+        table[key] = pos
+
+        if candidate is None or pos - candidate > LZ4_MAX_OFFSET:
+            pos += 4
+            continue
+
+        # Extend match (must end before the last literals).
+        match_end = pos + LZ4_MIN_MATCH
+        end_limit = n - LZ4_LAST_LITERALS
+        delta = pos - candidate
+        while match_end + 16 <= end_limit and data[match_end:match_end+16] == data[match_end-delta:match_end-delta+16]:
+            match_end += 16
+        while match_end < end_limit and data[match_end] == data[match_end - delta]:
+            match_end += 1
+
+        # Write sequence (token, literals, offset, match length).
+        literal_length = pos - anchor
+        match_length = match_end - pos - LZ4_MIN_MATCH
+        out.append((min(literal_length, 15) << 4) | min(match_length, 15))
+        if literal_length >= 15:
+            _lz4_length(out, literal_length - 15)
+        out.extend(data[anchor:pos])
+        out.extend(delta.to_bytes(2, 'little'))
+        if match_length >= 15:
+            _lz4_length(out, match_length - 15)
+
+        # Continue at next pixel boundary after the match.
+        anchor = match_end
+        pos = match_end + (-match_end % 4)
+
+    # Last sequence (literals only).
+    literal_length = n - anchor
+    out.append(min(literal_length, 15) << 4)
+    if literal_length >= 15:
+        _lz4_length(out, literal_length - 15)
+    out.extend(data[anchor:])
+
+    return bytes(out)
+
+def compress_rows(pixel_data, row_size, method):
+    '''
+    Compress pixel array row by row, so that each row can be decompressed on its own.
+    '''
+    if method not in COMPRESSION_METHODS:
+        raise RuntimeError(f'Unknown compression method: {method}')
+
+    encode = rle_encode if method == 'rle' else lz4_compress
+
+    data = bytearray()
+    row_offsets = [0]
+    for start in range(0, len(pixel_data), row_size):
+        data.extend(encode(pixel_data[start:start+row_size]))
+        row_offsets.append(len(data))
+
+    return CompressedPixels(method, bytes(data), row_offsets, len(pixel_data))
@@ -0,0 +1,235 @@
+from bmp_argb8888_to_c.bitmap_to_array import BitmapToArray
+from bmp_argb8888_to_c.bitmap_to_font import BitmapToFont
+from bmp_argb8888_to_c.bundle import bundle_c_header, write_bundle
+from bmp_argb8888_to_c.delta import DEFAULT_SECTOR_SIZE, changed_ranges, sector_crcs, write_delta
+from bmp_argb8888_to_c.font_pack import DEFAULT_FIRST_CHAR, packed_fonts, write_c_font_pack
+from bmp_argb8888_to_c.object_file import elf_object
+from bmp_argb8888_to_c.template import DELTA_MANIFEST_TEMPLATE, INCBIN_TEMPLATE
+from bmp_argb8888_to_c.util import c_compatible_name, format_c_array_values, write_atomic
+
+from pathlib import Path
+
+import zlib
+
+# Object formats for binary output (with file extension).
+OBJECT_FORMATS = {
+    'incbin': '.S',
+    'elf': '.o',
+}
+
+# Conversion modes (with file extension of output files).
+CONVERSION_MODES = {
+    'array': '.h',
+    'aligned': '.h',
+    'font': '.c',
+    'pixels': '.h',
+    'compressed': '.h',
+    'tiled': '.h',
+}
+
+def convert_file(input_file, out_file, mode, cache = None, **options):
+    '''
+    Convert a single bitmap file and write the result to the output file.
+
+    Additional options are passed on to the conversion (e.g., font height and
+    width for mode `font`, see class `BitmapToFont`). Options `transform` and
+    `top_down` are applied to the image before the conversion (see class
+    `BitmapARGB8888`, only `transform` for mode `font`).
+
+    If a cache (see class `ConversionCache`) is given and it contains an entry for
+    the same input, mode and options, the conversion is skipped. Returns a dict with
+    information about the conversion (e.g., the compression ratio, might be empty,
+    taken from the cache entry if the conversion was skipped) and whether the
+    conversion was skipped.
+    '''
+    if mode not in CONVERSION_MODES:
+        raise RuntimeError(f'Unknown conversion mode: {mode}')
+
+    if cache:
+        # The generated names depend on the input file name (not only its content).
+        key = cache.key(input_file, mode, name = Path(input_file).stem, **options)
+        info = cache.restore(key, out_file)
+        if info is not None:
+            return (info, True)
+
+    if mode != 'font':
+        # Transform of the image (applied when reading the pixel data).
+        options = dict(options)
+        image_options = dict(transform = options.pop('transform', None), top_down = options.pop('top_down', None))
+
+    if mode == 'font':
+        bmp = BitmapToFont(input_file, **options)
+        with write_atomic(out_file, 'w') as file:
+            info = bmp.write_c_font(file)
+    elif mode == 'pixels':
+        bmp = BitmapToArray(input_file, use_mmap = True, **image_options)
+        with write_atomic(out_file, 'w') as file:
+            info = bmp.write_c_pixel_array(file, **options)
+    elif mode == 'compressed':
+        bmp = BitmapToArray(input_file, use_mmap = True, **image_options)
+        with write_atomic(out_file, 'w') as file:
+            info = bmp.write_c_compressed_array(file, **options)
+    elif mode == 'tiled':
+        bmp = BitmapToArray(input_file, use_mmap = True, **image_options)
+        with write_atomic(out_file, 'w') as file:
+            info = bmp.write_c_tiled_array(file, **options)
+    else:
+        bmp = BitmapToArray(input_file, use_mmap = True, **image_options)
+        with write_atomic(out_file, 'w') as file:
+            info = bmp.write_c_array(file, aligned = (mode == 'aligned'), **options)
+
+    if cache:
+        cache.store(key, out_file, info)
+
+    return (info or {}, False)
+
+def convert_file_to_binary(input_file, out_dir, object_format = 'incbin', machine = 'arm', alignment = 4, row_alignment = None,
+        transform = None, top_down = None):
+    '''
+    Convert a single bitmap file to raw binary data (same layout as mode `aligned`,
+    with the given alignment and row padding) and write it to the output directory,
+    together with a C header declaring the data and either an assembler stub
+    including the binary file (`incbin`) or an ELF object file containing the data
+    (`elf`). Optionally, the image is transformed first (see class `BitmapARGB8888`).
+
+    Returns the list of output files.
+    '''
+    if object_format not in OBJECT_FORMATS:
+        raise RuntimeError(f'Unknown object format: {object_format}')
+
+    bmp = BitmapToArray(input_file, use_mmap = True, transform = transform, top_down = top_down)
+    name = c_compatible_name(bmp.file_name.stem)
+    stem = Path(out_dir) / bmp.file_name.stem
+
+    bin_file = stem.with_suffix('.bin')
+    header_file = stem.with_suffix('.h')
+    object_file = stem.with_suffix(OBJECT_FORMATS[object_format])
+
+    with write_atomic(bin_file, 'wb') as file:
+        bmp.write_binary(file, alignment, row_alignment)
+
+    with write_atomic(header_file, 'w') as file:
+        file.write(bmp.as_c_binary_header(alignment, row_alignment))
+
+    _write_object_file(object_file, object_format, name, bin_file, alignment, machine)
+
+    return [bin_file, header_file, object_file]
+
+def convert_files_to_bundle(assets, out_base, alignment = 4, object_format = None, machine = 'arm'):
+    '''
+    Pack assets (see functions `bitmap_assets` and `font_asset`) into a single
+    bundle with index table and write it to a binary file, together with a C header
+    describing the bundle (asset IDs, formats, etc.). Optionally, an assembler stub
+    (`incbin`) or an ELF object file (`elf`) containing the bundle is written as well.
+
+    Returns the list of output files.
+    '''
+    if object_format is not None and object_format not in OBJECT_FORMATS:
+        raise RuntimeError(f'Unknown object format: {object_format}')
+
+    out_base = Path(out_base)
+    name = c_compatible_name(out_base.name)
+
+    bin_file = out_base.with_name(out_base.name + '.bin')
+    header_file = out_base.with_name(out_base.name + '.h')
+
+    with write_atomic(bin_file, 'wb') as file:
+        (entries, size) = write_bundle(file, assets, alignment)
+
+    with write_atomic(header_file, 'w') as file:
+        file.write(bundle_c_header(name, assets, entries, size, alignment))
+
+    if object_format is None:
+        return [bin_file, header_file]
+
+    object_file = out_base.with_name(out_base.name + OBJECT_FORMATS[object_format])
+    _write_object_file(object_file, object_format, name, bin_file, alignment, machine)
+
+    return [bin_file, header_file, object_file]
+
+def convert_files_to_font_pack(fonts, out_file, bpp = 8, dither = False, first_char = DEFAULT_FIRST_CHAR,
+        chars = None, jobs = None):
+    '''
+    Convert several glyph sheets, given as tuples (file name, font height, font
+    width), in parallel into a font pack and write it as a single C translation unit
+    (see function `write_c_font_pack`). The name of the font pack is derived from
+    the name of the output file. Optionally, only the characters in the given ranges
+    (see function `parse_char_ranges`) are included.
+
+    Returns a dict with the number of fonts, the number of glyphs and the table size.
+    '''
+    fonts = packed_fonts(fonts, bpp, dither, first_char, chars, jobs)
+
+    with write_atomic(out_file, 'w') as file:
+        return write_c_font_pack(file, c_compatible_name(Path(out_file).stem), fonts)
+
+def _load_delta_input(input_file):
+    # Bitmaps are compared as flashed, i.e., with 4-byte aligned pixel array (see
+    # mode `aligned`), any other file (e.g., a bundle) as is.
+    if Path(input_file).suffix.lower() == '.bmp':
+        bmp = BitmapToArray(input_file, use_mmap = True)
+        (header_bytes, gap_size, _) = bmp._aligned_headers()
+        return (bmp.as_binary(), bmp.header.image_width, len(header_bytes) + gap_size)
+    return (Path(input_file).read_bytes(), None, None)
+
+def convert_files_to_delta(old_file, new_file, out_base, sector_size = DEFAULT_SECTOR_SIZE, rows = False):
+    '''
+    Compare two versions of a bitmap (binary data as for `argb8888_to_bin`) or of
+    any other binary file (e.g., a bundle) and write a delta with the changed ranges
+    of the new version (see function `write_delta`), together with a C header
+    containing the CRC-32 of each sector of the new version (manifest) and a decoder.
+
+    The data is compared sector by sector, or for bitmaps of the same width and
+    pixel array offset row by row (`rows`). Returns the list of output files and a
+    dict with information about the delta.
+    '''
+    (old, old_width, old_base) = _load_delta_input(old_file)
+    (new, new_width, new_base) = _load_delta_input(new_file)
+
+    if rows:
+        if new_width is None or (old_width, old_base) != (new_width, new_base):
+            raise RuntimeError('Row granularity requires two bitmaps with the same width and pixel array offset.')
+        (block_size, base) = (4 * new_width, new_base)
+    else:
+        (block_size, base) = (sector_size, 0)
+
+    ranges = changed_ranges(old, new, block_size, base)
+
+    out_base = Path(out_base)
+    name = c_compatible_name(out_base.name)
+    delta_file = out_base.with_name(out_base.name + '.delta')
+    header_file = out_base.with_name(out_base.name + '.h')
+
+    with write_atomic(delta_file, 'wb') as file:
+        delta_size = write_delta(file, old, new, ranges, block_size)
+
+    crcs = sector_crcs(new, sector_size)
+    with write_atomic(header_file, 'w') as file:
+        file.write(DELTA_MANIFEST_TEMPLATE.format(
+            name = name,
+            upper_name = name.upper(),
+            guard = 'INCLUDE_{name}_H_'.format(name = name.upper()),
+            size = len(new),
+            crc = zlib.crc32(new),
+            sector_size = sector_size,
+            sector_count = len(crcs),
+            sector_crcs = format_c_array_values([f'0x{crc:08X}' for crc in crcs]),
+        ))
+
+    info = dict(
+        changed_ranges = len(ranges),
+        changed_bytes = sum(r.length for r in ranges),
+        delta_size = delta_size,
+        full_size = len(new),
+    )
+
+    return ([delta_file, header_file], info)
+
+def _write_object_file(object_file, object_format, name, bin_file, alignment, machine):
+    # Write assembler stub including the binary file or ELF object file containing its data.
+    if object_format == 'incbin':
+        with write_atomic(object_file, 'w') as file:
+            file.write(INCBIN_TEMPLATE.format(name = name, bin_file = bin_file.name, alignment = alignment))
+    else:
+        with write_atomic(object_file, 'wb') as file:
+            file.write(elf_object(name, bin_file.read_bytes(), machine, alignment))
@@ -1,8 +1,252 @@
-from bmp_argb8888_to_c.bitmap_to_array import BitmapToArray
-from bmp_argb8888_to_c.bitmap_to_font import BitmapToFont
+from bmp_argb8888_to_c.alpha import ALPHA_BITS_PER_PIXEL
+from bmp_argb8888_to_c.bitmap_argb8888 import BitmapARGB8888
+from bmp_argb8888_to_c.batch import find_input_files, convert_files
+from bmp_argb8888_to_c.bundle import bitmap_assets, font_asset
+from bmp_argb8888_to_c.cache import ConversionCache, default_cache_dir
+from bmp_argb8888_to_c.compress import COMPRESSION_METHODS
+from bmp_argb8888_to_c.conversion import CONVERSION_MODES, OBJECT_FORMATS, convert_file, convert_file_to_binary, convert_files_to_bundle
+from bmp_argb8888_to_c.conversion import convert_files_to_delta, convert_files_to_font_pack
+from bmp_argb8888_to_c.delta import DEFAULT_SECTOR_SIZE
+from bmp_argb8888_to_c.font_pack import DEFAULT_FIRST_CHAR, parse_char_ranges
+from bmp_argb8888_to_c.instrumentation import Profiler
+from bmp_argb8888_to_c.object_file import ELF_MACHINES
+from bmp_argb8888_to_c.pixel_format import PIXEL_FORMATS, QUANTIZERS
+from bmp_argb8888_to_c.transform import TRANSFORMS
+from bmp_argb8888_to_c.watch import DEFAULT_DEBOUNCE, watch_files
+
+from contextlib import nullcontext
+from pathlib import Path
 
 import argparse
+import json
 import sys
+import time
+
+def add_cache_arguments(parser):
+    '''
+    Add command line arguments for the conversion cache.
+    '''
+    parser.add_argument(
+        '--no-cache',
+        action = 'store_true',
+        help = 'always convert, do not use the conversion cache'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        default = None,
+        action = 'store',
+        metavar = 'CACHE_DIR',
+        help = f'directory of the conversion cache (default: {default_cache_dir()})'
+    )
+
+def add_pixel_format_arguments(parser):
+    '''
+    Add command line arguments for converting the pixel format.
+    '''
+    parser.add_argument(
+        '-f', '--pixel-format',
+        default = None,
+        choices = list(PIXEL_FORMATS),
+        action = 'store',
+        help = 'convert pixel array to this format (output without bitmap headers)'
+    )
+
+    parser.add_argument(
+        '--max-colors',
+        type = int,
+        default = 256,
+        action = 'store',
+        metavar = 'MAX_COLORS',
+        help = 'maximum number of colors for pixel format L8 (default: 256)'
+    )
+
+    parser.add_argument(
+        '--quantizer',
+        default = QUANTIZERS[0],
+        choices = QUANTIZERS,
+        action = 'store',
+        help = f'color quantizer for pixel format L8 (default: {QUANTIZERS[0]})'
+    )
+
+def get_pixel_format_options(args):
+    '''
+    Retrieve options for converting the pixel format from command line arguments.
+    '''
+    return dict(
+        pixel_format = args.pixel_format or 'ARGB8888',
+        max_colors = args.max_colors,
+        quantizer = args.quantizer,
+    )
+
+def add_compression_arguments(parser):
+    '''
+    Add command line arguments for compressing the pixel array.
+    '''
+    parser.add_argument(
+        '-c', '--compress',
+        default = None,
+        choices = list(COMPRESSION_METHODS),
+        action = 'store',
+        help = 'compress pixel array row by row (output without bitmap headers, with C decoder)'
+    )
+
+def add_alignment_arguments(parser):
+    '''
+    Add command line arguments for the alignment of the pixel array and its rows.
+    '''
+    parser.add_argument(
+        '-a', '--alignment',
+        type = int,
+        default = 4,
+        action = 'store',
+        metavar = 'ALIGNMENT',
+        help = 'alignment of the data and of the pixel array in bytes, power of two ' +
+            '(e.g., 32 for cache lines, default: 4)'
+    )
+
+    parser.add_argument(
+        '--row-alignment',
+        type = int,
+        default = None,
+        action = 'store',
+        metavar = 'ROW_ALIGNMENT',
+        help = 'pad each row of the pixel array to a multiple of this number of bytes, power of two ' +
+            '(e.g., for DMA bursts, default: no padding)'
+    )
+
+def get_alignment_options(args):
+    '''
+    Retrieve options for the alignment of the pixel array from command line arguments.
+    '''
+    return dict(
+        alignment = args.alignment,
+        row_alignment = args.row_alignment,
+    )
+
+def add_transform_arguments(parser, row_order = True):
+    '''
+    Add command line arguments for transforming the image (and, optionally, for the
+    row order of the pixel array).
+    '''
+    parser.add_argument(
+        '--transform',
+        default = None,
+        choices = TRANSFORMS,
+        action = 'store',
+        help = 'flip (horizontally or vertically) or rotate (clockwise) the image before converting'
+    )
+
+    if row_order:
+        parser.add_argument(
+            '--top-down',
+            action = 'store_true',
+            help = 'store rows of the pixel array from top to bottom (negative image height in the bitmap header)'
+        )
+
+def get_transform_options(args):
+    '''
+    Retrieve options for transforming the image from command line arguments.
+    '''
+    return dict(
+        transform = args.transform,
+        top_down = True if args.top_down else None,
+    )
+
+def add_premultiply_arguments(parser):
+    '''
+    Add command line arguments for premultiplying the color channels by alpha.
+    '''
+    parser.add_argument(
+        '--premultiply',
+        action = 'store_true',
+        help = 'premultiply color channels by alpha (for cheaper blending at runtime)'
+    )
+
+def add_span_arguments(parser):
+    '''
+    Add command line arguments for the transparency span table.
+    '''
+    parser.add_argument(
+        '--spans',
+        action = 'store_true',
+        help = 'add table with spans of transparent, opaque and semi-transparent pixels of each row ' +
+            '(to skip, copy or blend whole spans at runtime)'
+    )
+
+def add_tile_arguments(parser):
+    '''
+    Add command line arguments for splitting the pixel array into tiles.
+    '''
+    parser.add_argument(
+        '-t', '--tile-size',
+        type = int,
+        default = None,
+        action = 'store',
+        metavar = 'TILE_SIZE',
+        help = 'split pixel array into tiles of this size (e.g., 8 or 16) and store identical tiles only once ' +
+            '(output without bitmap headers)'
+    )
+
+def add_profile_arguments(parser):
+    '''
+    Add command line arguments for profiling the conversion.
+    '''
+    parser.add_argument(
+        '--profile',
+        action = 'store_true',
+        help = 'print time, throughput and peak memory of each conversion stage (to stderr)'
+    )
+
+    parser.add_argument(
+        '--trace',
+        default = None,
+        action = 'store',
+        metavar = 'TRACE_FILE',
+        help = 'save records of all conversion stages to this file (JSON)'
+    )
+
+def get_profiler(args):
+    '''
+    Create profiler according to command line arguments (None if not profiling).
+    '''
+    return Profiler() if (args.profile or args.trace) else None
+
+def report_profile(args, profiler):
+    '''
+    Print summary and save trace of the profiler according to command line arguments.
+    '''
+    if profiler is None:
+        return
+    if args.profile:
+        profiler.print_summary()
+    if args.trace:
+        profiler.save(args.trace)
+
+def get_cache_dir(args):
+    '''
+    Retrieve cache directory from command line arguments (None if caching is disabled).
+    '''
+    return None if args.no_cache else (args.cache_dir or default_cache_dir())
+
+def convert_single_file(args, mode, **options):
+    '''
+    Convert single input file according to command line arguments.
+    '''
+    input_file = Path(args.input_file).resolve(strict = True)
+    out_file = args.output_file or (input_file.stem + CONVERSION_MODES[mode])
+
+    cache_dir = get_cache_dir(args)
+    cache = ConversionCache(cache_dir) if cache_dir else None
+
+    profiler = get_profiler(args)
+    with profiler or nullcontext():
+        (info, up_to_date) = convert_file(input_file, out_file, mode, cache, **options)
+    report_profile(args, profiler)
+
+    print(f'Output up to date: {out_file}' if up_to_date else f'Output written to {out_file}')
+    for (key, value) in info.items():
+        print(f'{key.replace("_", " ").capitalize()}: ' + (f'{value:.2f}' if isinstance(value, float) else f'{value}'))
 
 def argb8888_to_c():
     '''
@@ -30,20 +274,41 @@ def argb8888_to_c():
         help = 'output file name'
     )
 
-    args = parser.parse_args()
+    add_pixel_format_arguments(parser)
 
-    try:
+    add_compression_arguments(parser)
+
+    add_tile_arguments(parser)
+
+    add_premultiply_arguments(parser)
 
-        bmp = BitmapToArray(args.input_file)
-        bmp_file = bmp.file_name
+    add_span_arguments(parser)
 
-        out = bmp.as_c_array()
-        out_file = args.output_file or (bmp_file.stem + '.h')
+    add_transform_arguments(parser)
 
-        with open(out_file, 'w') as file:
-            file.write(out)
+    add_cache_arguments(parser)
 
-        print(f'Output written to {out_file}')
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    if sum(map(bool, (args.pixel_format, args.compress, args.tile_size))) > 1:
+        parser.error('options --pixel-format, --compress and --tile-size cannot be combined')
+
+    if (args.premultiply or args.spans) and (args.pixel_format or args.compress or args.tile_size):
+        parser.error('options --premultiply and --spans cannot be combined with --pixel-format, --compress or --tile-size')
+
+    try:
+
+        if args.pixel_format:
+            convert_single_file(args, 'pixels', **get_pixel_format_options(args), **get_transform_options(args))
+        elif args.compress:
+            convert_single_file(args, 'compressed', method = args.compress, **get_transform_options(args))
+        elif args.tile_size:
+            convert_single_file(args, 'tiled', tile_size = args.tile_size, **get_transform_options(args))
+        else:
+            convert_single_file(args, 'array', premultiplied = args.premultiply, spans = args.spans,
+                **get_transform_options(args))
         sys.exit( 0 )
 
     except Exception as err:
@@ -53,11 +318,11 @@ def argb8888_to_c():
 
 def argb8888_to_c_aligned():
     '''
-    Console script for converting bitmap data to C array with 4-byte aligned pixel array.
+    Console script for converting bitmap data to C array with memory aligned pixel array.
     '''
     # Command line parser.
     parser = argparse.ArgumentParser(
-        description = 'Convert bitmap data to C array with 4-byte aligned pixel array.'
+        description = 'Convert bitmap data to C array with memory aligned pixel array (4-byte aligned by default).'
     )
 
     required = parser.add_argument_group( 'required named arguments' )
@@ -77,20 +342,24 @@ def argb8888_to_c_aligned():
         help = 'output file name'
     )
 
-    args = parser.parse_args()
+    add_alignment_arguments(parser)
 
-    try:
+    add_premultiply_arguments(parser)
+
+    add_span_arguments(parser)
+
+    add_transform_arguments(parser)
 
-        bmp = BitmapToArray(args.input_file)
-        bmp_file = bmp.file_name
+    add_cache_arguments(parser)
 
-        out = bmp.as_c_array_aligned()
-        out_file = args.output_file or (bmp_file.stem + '.h')
+    add_profile_arguments(parser)
 
-        with open(out_file, 'w') as file:
-            file.write(out)
+    args = parser.parse_args()
+
+    try:
 
-        print(f'Output written to {out_file}')
+        convert_single_file(args, 'aligned', premultiplied = args.premultiply, spans = args.spans,
+            **get_alignment_options(args), **get_transform_options(args))
         sys.exit( 0 )
 
     except Exception as err:
@@ -140,20 +409,666 @@ def argb8888_to_c_font():
         help = 'output file name'
     )
 
+    parser.add_argument(
+        '-b', '--bpp',
+        type = int,
+        default = 8,
+        choices = ALPHA_BITS_PER_PIXEL,
+        action = 'store',
+        help = 'bits per pixel of the font transparency information (default: 8)'
+    )
+
+    parser.add_argument(
+        '--dither',
+        action = 'store_true',
+        help = 'use dithering when reducing the bits per pixel'
+    )
+
+    parser.add_argument(
+        '--compact',
+        action = 'store_true',
+        help = 'crop glyphs to their bounding box and store identical glyphs only once'
+    )
+
+    add_span_arguments(parser)
+
+    add_transform_arguments(parser, row_order = False)
+
+    add_cache_arguments(parser)
+
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.compact and args.spans:
+        parser.error('options --compact and --spans cannot be combined')
+
+    try:
+
+        convert_single_file(args, 'font', font_height = args.font_height, font_width = args.font_width,
+            bpp = args.bpp, dither = args.dither, compact = args.compact, transform = args.transform, spans = args.spans)
+        sys.exit( 0 )
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+def argb8888_to_c_font_pack():
+    '''
+    Console script for converting several glyph sheets to a single font pack.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'Convert several bitmaps (glyph sheets, e.g., of one typeface in several sizes) in parallel ' +
+            'to a single C file for anti-aliased fonts, with one shared glyph table.'
+    )
+
+    parser.add_argument(
+        '--font',
+        nargs = 3,
+        default = [],
+        action = 'append',
+        metavar = ('FONT_FILE', 'FONT_HEIGHT', 'FONT_WIDTH'),
+        help = 'input bitmap file for anti-aliased fonts, with font height and width (can be repeated)'
+    )
+
+    parser.add_argument(
+        '-o', '--output-file',
+        default = 'font_pack.c',
+        action = 'store',
+        metavar = 'OUTPUT_FILE',
+        help = 'output file name, also used as name of the font pack (default: font_pack.c)'
+    )
+
+    parser.add_argument(
+        '--chars',
+        default = None,
+        action = 'store',
+        metavar = 'RANGES',
+        help = 'include only these characters, as comma-separated characters, codes (at least two digits) or ' +
+            'ranges (e.g., 32-126,0xB0 or 0-9,A-Z, 0x2C for a comma), default: all characters'
+    )
+
+    parser.add_argument(
+        '--first-char',
+        type = lambda x: int(x, 0),
+        default = DEFAULT_FIRST_CHAR,
+        action = 'store',
+        metavar = 'CODE',
+        help = f'character code of the first glyph of each glyph sheet (default: {DEFAULT_FIRST_CHAR})'
+    )
+
+    parser.add_argument(
+        '-b', '--bpp',
+        type = int,
+        default = 8,
+        choices = ALPHA_BITS_PER_PIXEL,
+        action = 'store',
+        help = 'bits per pixel of the font transparency information (default: 8)'
+    )
+
+    parser.add_argument(
+        '--dither',
+        action = 'store_true',
+        help = 'use dithering when reducing the bits per pixel'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type = int,
+        default = None,
+        action = 'store',
+        metavar = 'JOBS',
+        help = 'number of parallel jobs (default: number of processors)'
+    )
+
+    args = parser.parse_args()
+
+    if not args.font:
+        parser.error('at least one font is required')
+
+    try:
+
+        fonts = [(font_file, int(font_height), int(font_width)) for (font_file, font_height, font_width) in args.font]
+        chars = parse_char_ranges(args.chars) if args.chars else None
+
+        Path(args.output_file).parent.mkdir(parents = True, exist_ok = True)
+
+        info = convert_files_to_font_pack(fonts, args.output_file, args.bpp, args.dither, args.first_char, chars, args.jobs)
+
+        print(f'Output written to {args.output_file}')
+        for (key, value) in info.items():
+            print(f'{key.replace("_", " ").capitalize()}: {value}')
+        sys.exit( 0 )
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+def add_batch_arguments(parser):
+    '''
+    Add command line arguments for converting many bitmap files (conversion mode,
+    output directory, parallel jobs and options of all conversion modes).
+    '''
+    parser.add_argument(
+        '-m', '--mode',
+        default = 'aligned',
+        choices = list(CONVERSION_MODES),
+        action = 'store',
+        help = 'conversion mode (default: aligned)'
+    )
+
+    parser.add_argument(
+        '--font-height',
+        type = int,
+        action = 'store',
+        metavar = 'FONT_HEIGHT',
+        help = 'font height (required for mode font)'
+    )
+
+    parser.add_argument(
+        '--font-width',
+        type = int,
+        action = 'store',
+        metavar = 'FONT_WIDTH',
+        help = 'font width (required for mode font)'
+    )
+
+    parser.add_argument(
+        '-o', '--output-dir',
+        default = '.',
+        action = 'store',
+        metavar = 'OUTPUT_DIR',
+        help = 'output directory (default: current directory)'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type = int,
+        default = None,
+        action = 'store',
+        metavar = 'JOBS',
+        help = 'number of parallel jobs (default: number of processors)'
+    )
+
+    parser.add_argument(
+        '-b', '--bpp',
+        type = int,
+        default = 8,
+        choices = ALPHA_BITS_PER_PIXEL,
+        action = 'store',
+        help = 'bits per pixel of the font transparency information (mode font, default: 8)'
+    )
+
+    parser.add_argument(
+        '--dither',
+        action = 'store_true',
+        help = 'use dithering when reducing the bits per pixel'
+    )
+
+    parser.add_argument(
+        '--compact',
+        action = 'store_true',
+        help = 'crop glyphs to their bounding box and store identical glyphs only once (mode font)'
+    )
+
+    add_pixel_format_arguments(parser)
+
+    add_compression_arguments(parser)
+
+    add_tile_arguments(parser)
+
+    add_alignment_arguments(parser)
+
+    add_premultiply_arguments(parser)
+
+    add_span_arguments(parser)
+
+    add_transform_arguments(parser)
+
+    add_cache_arguments(parser)
+
+    add_profile_arguments(parser)
+
+def get_batch_options(parser, args):
+    '''
+    Retrieve options for the conversion mode from command line arguments.
+    '''
+    if args.mode == 'font' and (args.font_height is None or args.font_width is None):
+        parser.error('mode font requires --font-height and --font-width')
+
+    if args.mode == 'font':
+        return dict(font_height = args.font_height, font_width = args.font_width,
+            bpp = args.bpp, dither = args.dither, compact = args.compact, transform = args.transform, spans = args.spans)
+    elif args.mode == 'pixels':
+        return dict(get_pixel_format_options(args), **get_transform_options(args))
+    elif args.mode == 'compressed':
+        return dict(method = args.compress or 'rle', **get_transform_options(args))
+    elif args.mode == 'tiled':
+        return dict(tile_size = args.tile_size or 16, **get_transform_options(args))
+    elif args.mode == 'aligned':
+        return dict(get_alignment_options(args), premultiplied = args.premultiply, spans = args.spans,
+            **get_transform_options(args))
+    else:
+        return dict(premultiplied = args.premultiply, spans = args.spans, **get_transform_options(args))
+
+def report_results(results):
+    '''
+    Print errors of batch conversion. Returns the number of errors.
+    '''
+    errors = [(input_file, error) for (input_file, _, error) in results if error]
+
+    for (input_file, error) in errors:
+        print(f'{input_file}: {error}')
+
+    return len(errors)
+
+def argb8888_to_c_batch():
+    '''
+    Console script for converting many bitmap files in parallel.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'Convert many bitmap files (directories or glob patterns) in parallel.'
+    )
+
+    required = parser.add_argument_group( 'required named arguments' )
+
+    required.add_argument(
+        'inputs',
+        nargs = '+',
+        action = 'store',
+        metavar = 'INPUT',
+        help = 'input bitmap file, directory or glob pattern (ARGB8888-formatted)'
+    )
+
+    add_batch_arguments(parser)
+
+    args = parser.parse_args()
+
+    options = get_batch_options(parser, args)
+
+    try:
+
+        input_files = find_input_files(args.inputs)
+
+        Path(args.output_dir).mkdir(parents = True, exist_ok = True)
+
+        profiler = get_profiler(args)
+
+        results = convert_files(input_files, args.output_dir, args.mode,
+            args.jobs, get_cache_dir(args), trace = profiler and profiler.records, **options)
+
+        report_profile(args, profiler)
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+    n_errors = report_results(results)
+
+    print(f'Converted {len(results) - n_errors} of {len(results)} file(s), output written to {args.output_dir}')
+    sys.exit( 1 if n_errors else 0 )
+
+def argb8888_to_c_watch():
+    '''
+    Console script for converting bitmap files whenever they change.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'Watch bitmap files and directories and convert bitmaps whenever they change.'
+    )
+
+    required = parser.add_argument_group( 'required named arguments' )
+
+    required.add_argument(
+        'inputs',
+        nargs = '+',
+        action = 'store',
+        metavar = 'INPUT',
+        help = 'input bitmap file or directory to watch (ARGB8888-formatted)'
+    )
+
+    add_batch_arguments(parser)
+
+    parser.add_argument(
+        '--debounce',
+        type = float,
+        default = DEFAULT_DEBOUNCE,
+        action = 'store',
+        metavar = 'SECONDS',
+        help = f'wait until files have not changed for this time before converting (default: {DEFAULT_DEBOUNCE})'
+    )
+
+    parser.add_argument(
+        '--poll',
+        action = 'store_true',
+        help = 'poll for changes instead of using inotify'
+    )
+
+    args = parser.parse_args()
+
+    options = get_batch_options(parser, args)
+
+    # Records of all rounds are collected, the summary covers all conversions so far.
+    profiler = get_profiler(args)
+
+    def report(results):
+        n_errors = report_results(results)
+        print(f'{time.strftime("%H:%M:%S")} Converted {len(results) - n_errors} of {len(results)} file(s)', flush = True)
+        report_profile(args, profiler)
+
+    try:
+
+        Path(args.output_dir).mkdir(parents = True, exist_ok = True)
+
+        print(f'Watching {", ".join(args.inputs)}, output written to {args.output_dir} (press Ctrl+C to stop)', flush = True)
+
+        watch_files(args.inputs, args.output_dir, args.mode, args.jobs, get_cache_dir(args),
+            args.debounce, args.poll, report, profiler and profiler.records, **options)
+
+    except KeyboardInterrupt:
+
+        sys.exit( 0 )
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+def argb8888_to_bin():
+    '''
+    Console script for converting bitmap data to raw binary data with object file.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'Convert bitmap data to raw binary data with memory aligned pixel array, ' +
+            'plus assembler stub (incbin) or ELF object file and C header.'
+    )
+
+    required = parser.add_argument_group( 'required named arguments' )
+
+    required.add_argument(
+        'input_file',
+        action = 'store',
+        metavar = 'INPUT_FILE',
+        help = 'input bitmap file (ARGB8888-formatted)'
+    )
+
+    parser.add_argument(
+        '-o', '--output-dir',
+        default = '.',
+        action = 'store',
+        metavar = 'OUTPUT_DIR',
+        help = 'output directory (default: current directory)'
+    )
+
+    parser.add_argument(
+        '--object',
+        default = 'incbin',
+        choices = list(OBJECT_FORMATS),
+        action = 'store',
+        help = 'object format: assembler stub with .incbin or ELF object file (default: incbin)'
+    )
+
+    parser.add_argument(
+        '--machine',
+        default = 'arm',
+        choices = list(ELF_MACHINES),
+        action = 'store',
+        help = 'target machine of ELF object file (default: arm)'
+    )
+
+    add_alignment_arguments(parser)
+
+    add_transform_arguments(parser)
+
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+
+        Path(args.output_dir).mkdir(parents = True, exist_ok = True)
+
+        profiler = get_profiler(args)
+        with profiler or nullcontext():
+            out_files = convert_file_to_binary(args.input_file, args.output_dir, args.object, args.machine,
+                **get_alignment_options(args), **get_transform_options(args))
+        report_profile(args, profiler)
+
+        print('Output written to ' + ', '.join(str(f) for f in out_files))
+        sys.exit( 0 )
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+def argb8888_to_bundle():
+    '''
+    Console script for packing many bitmaps and fonts into a single asset bundle.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'Pack bitmaps and fonts into a single aligned asset bundle with index table ' +
+            '(binary file plus C header).'
+    )
+
+    parser.add_argument(
+        'input_files',
+        nargs = '*',
+        action = 'store',
+        metavar = 'INPUT_FILE',
+        help = 'input bitmap file (ARGB8888-formatted)'
+    )
+
+    parser.add_argument(
+        '--font',
+        nargs = 3,
+        default = [],
+        action = 'append',
+        metavar = ('FONT_FILE', 'FONT_HEIGHT', 'FONT_WIDTH'),
+        help = 'input bitmap file for anti-aliased fonts, with font height and width (can be repeated)'
+    )
+
+    parser.add_argument(
+        '-o', '--output-base',
+        default = 'bundle',
+        action = 'store',
+        metavar = 'OUTPUT_BASE',
+        help = 'base name of output files, also used as name of the bundle (default: bundle)'
+    )
+
+    parser.add_argument(
+        '-a', '--alignment',
+        type = int,
+        default = 4,
+        action = 'store',
+        metavar = 'ALIGNMENT',
+        help = 'alignment of each asset in bytes, power of two (e.g., 32 or 64 for cache lines, default: 4)'
+    )
+
+    parser.add_argument(
+        '-b', '--bpp',
+        type = int,
+        default = 8,
+        choices = ALPHA_BITS_PER_PIXEL,
+        action = 'store',
+        help = 'bits per pixel of the font transparency information (default: 8)'
+    )
+
+    parser.add_argument(
+        '--dither',
+        action = 'store_true',
+        help = 'use dithering when reducing the bits per pixel'
+    )
+
+    add_pixel_format_arguments(parser)
+
+    parser.add_argument(
+        '--object',
+        default = None,
+        choices = list(OBJECT_FORMATS),
+        action = 'store',
+        help = 'additionally write assembler stub (incbin) or ELF object file containing the bundle'
+    )
+
+    parser.add_argument(
+        '--machine',
+        default = 'arm',
+        choices = list(ELF_MACHINES),
+        action = 'store',
+        help = 'target machine of ELF object file (default: arm)'
+    )
+
+    args = parser.parse_args()
+
+    if not args.input_files and not args.font:
+        parser.error('at least one input file or font is required')
+
+    try:
+
+        assets = []
+        for input_file in args.input_files:
+            assets.extend(bitmap_assets(input_file, **get_pixel_format_options(args)))
+        for (font_file, font_height, font_width) in args.font:
+            assets.append(font_asset(font_file, int(font_height), int(font_width), args.bpp, args.dither))
+
+        Path(args.output_base).parent.mkdir(parents = True, exist_ok = True)
+
+        out_files = convert_files_to_bundle(assets, args.output_base, args.alignment, args.object, args.machine)
+
+        print(f'Packed {len(assets)} asset(s), output written to ' + ', '.join(str(f) for f in out_files))
+        sys.exit( 0 )
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+def argb8888_info():
+    '''
+    Console script for listing the metadata of bitmap files.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'List metadata of bitmap files (only the headers are read).'
+    )
+
+    required = parser.add_argument_group( 'required named arguments' )
+
+    required.add_argument(
+        'inputs',
+        nargs = '+',
+        action = 'store',
+        metavar = 'INPUT',
+        help = 'input bitmap file, directory or glob pattern (ARGB8888-formatted)'
+    )
+
+    parser.add_argument(
+        '--json',
+        action = 'store_true',
+        help = 'print metadata as JSON'
+    )
+
+    args = parser.parse_args()
+
+    try:
+
+        input_files = find_input_files(args.inputs)
+
+    except Exception as err:
+
+        print( str( err ) )
+        sys.exit( 1 )
+
+    infos = []
+    for input_file in input_files:
+        try:
+            infos.append(BitmapARGB8888(input_file, lazy = True).info())
+        except Exception as err:
+            infos.append(dict(file = str(input_file), error = str(err)))
+
+    if args.json:
+        json.dump(infos, sys.stdout, indent = 2)
+        print()
+    else:
+        for info in infos:
+            if 'error' in info:
+                print(f'{info["file"]}: error: {info["error"]}')
+                continue
+            print(f'{info["file"]}: {info["width"]}x{info["height"]}' +
+                (' (top-down)' if info['top_down'] else '') +
+                f', pixel array offset {info["offset_pixel_array"]} (gap {info["gap_size"]}), {info["file_size"]} bytes')
+
+    sys.exit( 1 if any('error' in info for info in infos) else 0 )
+
+def argb8888_delta():
+    '''
+    Console script for generating a delta between two versions of a bitmap or bundle.
+    '''
+    # Command line parser.
+    parser = argparse.ArgumentParser(
+        description = 'Generate delta between two versions of a bitmap (or a bundle) for partial updates, ' +
+            'plus C header with sector CRC manifest.'
+    )
+
+    required = parser.add_argument_group( 'required named arguments' )
+
+    required.add_argument(
+        'old_file',
+        action = 'store',
+        metavar = 'OLD_FILE',
+        help = 'old version (bitmap file or binary file, e.g., bundle)'
+    )
+
+    required.add_argument(
+        'new_file',
+        action = 'store',
+        metavar = 'NEW_FILE',
+        help = 'new version (bitmap file or binary file, e.g., bundle)'
+    )
+
+    parser.add_argument(
+        '-o', '--output-base',
+        default = None,
+        action = 'store',
+        metavar = 'OUTPUT_BASE',
+        help = 'base name of output files, also used as name in the C header (default: name of new file + _delta)'
+    )
+
+    parser.add_argument(
+        '-s', '--sector-size',
+        type = int,
+        default = DEFAULT_SECTOR_SIZE,
+        action = 'store',
+        metavar = 'SECTOR_SIZE',
+        help = f'flash sector size in bytes (default: {DEFAULT_SECTOR_SIZE})'
+    )
+
+    parser.add_argument(
+        '--rows',
+        action = 'store_true',
+        help = 'compare bitmaps row by row instead of sector by sector'
+    )
+
     args = parser.parse_args()
 
     try:
 
-        bmp = BitmapToFont(args.input_file, args.font_height, args.font_width)
-        bmp_file = bmp.file_name
+        out_base = args.output_base or (Path(args.new_file).stem + '_delta')
 
-        out = bmp.as_c_font()
-        out_file = args.output_file or (bmp_file.stem + '.c')
+        Path(out_base).parent.mkdir(parents = True, exist_ok = True)
 
-        with open(out_file, 'w') as file:
-            file.write(out)
+        (out_files, info) = convert_files_to_delta(args.old_file, args.new_file, out_base, args.sector_size, args.rows)
 
-        print(f'Output written to {out_file}')
+        print('Output written to ' + ', '.join(str(f) for f in out_files))
+        for (key, value) in info.items():
+            print(f'{key.replace("_", " ").capitalize()}: {value}')
         sys.exit( 0 )
 
     except Exception as err:
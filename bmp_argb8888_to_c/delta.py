@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+import struct
+import zlib
+
+# Default flash sector size (in bytes).
+DEFAULT_SECTOR_SIZE = 4096
+
+# Delta header (magic, version, reserved, block size, size and CRC-32 of old and new
+# data, number of ranges), followed by the ranges, each one followed by its data.
+DELTA_MAGIC = b'BMPD'
+DELTA_VERSION = 1
+DELTA_HEADER = struct.Struct('<4sHHIIIIII')
+DELTA_RANGE = struct.Struct('<II')
+
+# Range of changed data (offset and length in bytes).
+DeltaRange = namedtuple('DeltaRange', ['offset', 'length'])
+
+def block_bounds(size, block_size, base = 0):
+    '''
+    Split data of the given size into blocks of `block_size` bytes, starting at
+    offset `base` (e.g., the pixel array offset for row granularity). Any data before
+    `base` forms a block of its own. Returns a list of (start, stop) pairs.
+    '''
+    if block_size < 1:
+        raise RuntimeError(f'Invalid block size: {block_size}')
+
+    bounds = [(0, min(base, size))] if base > 0 else []
+    bounds.extend((start, min(start + block_size, size)) for start in range(base, size, block_size))
+    return bounds
+
+def changed_ranges(old, new, block_size, base = 0):
+    '''
+    Compare old and new data block by block (see function `block_bounds`) and return
+    the ranges of the new data that differ, with adjacent changed blocks merged.
+    '''
+    (old, new) = (memoryview(old), memoryview(new))
+
+    ranges = []
+    for (start, stop) in block_bounds(len(new), block_size, base):
+        if old[start:stop] == new[start:stop]:
+            continue
+        if ranges and ranges[-1].offset + ranges[-1].length == start:
+            ranges[-1] = DeltaRange(ranges[-1].offset, stop - ranges[-1].offset)
+        else:
+            ranges.append(DeltaRange(start, stop - start))
+
+    return ranges
+
+def sector_crcs(data, sector_size = DEFAULT_SECTOR_SIZE):
+    '''
+    Compute CRC-32 (IEEE 802.3, as zlib) of each sector of the data (the last sector
+    might be shorter).
+    '''
+    data = memoryview(data)
+    return [zlib.crc32(data[start:start + sector_size]) for start in range(0, len(data), sector_size)]
+
+def write_delta(file, old, new, ranges, block_size):
+    '''
+    Write delta (header, then each range followed by its data) to a binary file-like
+    object. Returns the size of the delta in bytes.
+    '''
+    new = memoryview(new)
+
+    size = DELTA_HEADER.size
+    file.write(DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, 0, block_size,
+        len(old), len(new), zlib.crc32(old), zlib.crc32(new), len(ranges)))
+
+    for r in ranges:
+        file.write(DELTA_RANGE.pack(r.offset, r.length))
+        file.write(new[r.offset:r.offset + r.length])
+        size += DELTA_RANGE.size + r.length
+
+    return size
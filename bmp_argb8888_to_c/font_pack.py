@@ -0,0 +1,177 @@
+from bmp_argb8888_to_c.alpha import alpha_row_size
+from bmp_argb8888_to_c.bitmap_to_font import BitmapToFont
+from bmp_argb8888_to_c.instrumentation import stage
+from bmp_argb8888_to_c.template import FONT_PACK_HEADER_TEMPLATE, FONT_PACK_FOOTER_TEMPLATE, SINGLE_FONT_PACK_TEMPLATE
+from bmp_argb8888_to_c.template import ELEMENT_SEPARATOR, TEMPLATE_LINE_SEPARATOR
+from bmp_argb8888_to_c.util import c_compatible_name, format_c_array_rows
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import re
+
+# Default character code of the first glyph of a glyph sheet (space, as for ASCII fonts).
+DEFAULT_FIRST_CHAR = 32
+
+# Range of consecutive characters of a font: code of the first character, number
+# of characters and index of the glyph of the first character within the font.
+CharRange = namedtuple('CharRange', ['first', 'count', 'glyph'])
+
+# Font of a font pack: name, glyph size, bits per pixel, character ranges and the
+# transparency information of each glyph (in the order of the character ranges).
+PackedFont = namedtuple('PackedFont', ['name', 'font_width', 'font_height', 'bpp', 'ranges', 'glyphs'])
+
+def parse_char_ranges(text):
+    '''
+    Parse comma-separated character ranges (e.g., `32-126,0xB0`). Each character is
+    given either as a single (literal) character, including digits (e.g., `0-9` or
+    `A-Z`), or as code with at least two digits (decimal or hexadecimal with prefix
+    `0x`, e.g., `0x2C` for a comma). Returns a sorted list of pairs (first, last) of
+    merged ranges.
+    '''
+    def char_code(token):
+        token = token.strip()
+        if len(token) == 1:
+            return ord(token)
+        try:
+            return int(token[2:], 16) if token.lower().startswith('0x') else int(token, 10)
+        except ValueError:
+            raise RuntimeError(f'Invalid character: {token}') from None
+
+    ranges = []
+    for part in text.split(','):
+        # Either a single character or two characters separated by '-' (which may be a character itself).
+        bounds = re.fullmatch(r'(.+?)-(.+)', part.strip())
+        (first, last) = (char_code(bounds[1]), char_code(bounds[2])) if bounds else (char_code(part),) * 2
+        if first > last:
+            raise RuntimeError(f'Invalid character range: {part}')
+        ranges.append((first, last))
+
+    merged = []
+    for (first, last) in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+
+    return merged
+
+def select_chars(n_glyphs, first_char = DEFAULT_FIRST_CHAR, chars = None):
+    '''
+    Select the characters of a glyph sheet with `n_glyphs` glyphs (the first one
+    for character code `first_char`) contained in the given character ranges (see
+    function `parse_char_ranges`, all characters if None). Returns a list of
+    `CharRange` and the list of the selected glyph indices within the sheet.
+    '''
+    if chars is None:
+        chars = [(first_char, first_char + n_glyphs - 1)]
+
+    ranges = []
+    indices = []
+    for (first, last) in chars:
+        (first, last) = (max(first, first_char), min(last, first_char + n_glyphs - 1))
+        if first > last:
+            continue
+        ranges.append(CharRange(first, last - first + 1, len(indices)))
+        indices.extend(range(first - first_char, last - first_char + 1))
+
+    return (ranges, indices)
+
+def packed_font(file_name, font_height, font_width, bpp = 8, dither = False, first_char = DEFAULT_FIRST_CHAR, chars = None):
+    '''
+    Extract the selected glyphs of a glyph sheet for a font pack (see class
+    `BitmapToFont` and function `select_chars`). Returns a `PackedFont`.
+    '''
+    font = BitmapToFont(file_name, font_height, font_width, bpp, dither)
+    (ranges, indices) = select_chars(font.n_fonts, first_char, chars)
+    if not indices:
+        raise RuntimeError(f'No characters selected from glyph sheet: {font.file_name}')
+
+    if len(ranges) > 255 or len(indices) > 0xFFFF:
+        raise RuntimeError(f'Too many characters selected from glyph sheet: {font.file_name}')
+
+    with stage('transform', font.file_name, len(font.pixel_data)):
+        glyphs = font.font_data(indices)
+
+    return PackedFont(c_compatible_name(font.file_name.stem), font_width, font_height, bpp, ranges, glyphs)
+
+def _packed_font_task(task):
+    (args, kwargs) = task
+    return packed_font(*args, **kwargs)
+
+def packed_fonts(fonts, bpp = 8, dither = False, first_char = DEFAULT_FIRST_CHAR, chars = None, jobs = None):
+    '''
+    Extract the selected glyphs of several glyph sheets, given as tuples (file name,
+    font height, font width), in parallel (using up to `jobs` processes). Returns
+    a list of `PackedFont`.
+    '''
+    tasks = [
+        ((file_name, font_height, font_width), dict(bpp = bpp, dither = dither, first_char = first_char, chars = chars))
+        for (file_name, font_height, font_width) in fonts
+        ]
+
+    if jobs == 1 or len(tasks) <= 1:
+        return [_packed_font_task(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers = jobs) as executor:
+        return list(executor.map(_packed_font_task, tasks))
+
+def write_c_font_pack(file, name, fonts):
+    '''
+    Write font pack (list of `PackedFont`) as a single C translation unit to a
+    file-like object: the glyphs of all fonts in one contiguous table, the character
+    ranges and an array of font descriptors (`sFONT_AA_PACK`).
+
+    Returns a dict with the number of fonts, the number of glyphs and the table size.
+    '''
+    names = [font.name for font in fonts]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise RuntimeError(f'Duplicate font names: {", ".join(duplicates)}')
+
+    upper_name = name.upper()
+
+    # Position of the glyphs and the character ranges of each font.
+    (offsets, range_offsets) = ([], [])
+    (offset, range_offset) = (0, 0)
+    for font in fonts:
+        offsets.append(offset)
+        range_offsets.append(range_offset)
+        offset += sum(map(len, font.glyphs))
+        range_offset += len(font.ranges)
+
+    template_fields = dict(
+        name = name,
+        upper_name = upper_name,
+        count = len(fonts),
+        font_ids = TEMPLATE_LINE_SEPARATOR.join(
+            f'{upper_name}_{font.name.upper()} = {i}, // {font.font_width}x{font.font_height}, {font.bpp} bpp'
+            for (i, font) in enumerate(fonts)
+            ),
+        ranges = TEMPLATE_LINE_SEPARATOR.join(
+            f'{{ {r.first}, {r.count}, {r.glyph} }}, // {font.name}'
+            for font in fonts for r in font.ranges
+            ),
+        fonts = TEMPLATE_LINE_SEPARATOR.join(
+            f'{{ {name}_table + {font_offset}, {name}_ranges + {range_offset}, {len(font.glyphs[0])}UL, ' +
+            f'{font.font_width}, {font.font_height}, {len(font.glyphs)}, {font.bpp}, {len(font.ranges)} }}, // {font.name}'
+            for (font, font_offset, range_offset) in zip(fonts, offsets, range_offsets)
+            ),
+    )
+
+    table_size = offset
+
+    with stage('emit', name, table_size):
+        file.write(FONT_PACK_HEADER_TEMPLATE.format(**template_fields))
+        for (font, font_offset) in zip(fonts, offsets):
+            row_size = alpha_row_size(font.font_width, font.bpp)
+            glyph_size = len(font.glyphs[0])
+            for r in font.ranges:
+                for i in range(r.count):
+                    file.write(SINGLE_FONT_PACK_TEMPLATE.format(
+                        font_data = format_c_array_rows(font.glyphs[r.glyph + i], n=row_size) + ELEMENT_SEPARATOR,
+                        pos = font_offset + (r.glyph + i) * glyph_size, font = font.name, char = r.first + i
+                        ))
+        file.write(FONT_PACK_FOOTER_TEMPLATE.format(**template_fields))
+
+    return dict(fonts = len(fonts), glyphs = sum(len(font.glyphs) for font in fonts), table_size = table_size)
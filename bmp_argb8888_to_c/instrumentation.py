@@ -0,0 +1,162 @@
+'''
+Stage timing and memory instrumentation.
+
+The conversion code marks its stages (e.g., parsing, transforming and emitting)
+with the context manager `stage`. Without registered callbacks, this has almost no
+overhead. Library users can register callbacks (see `add_callback`) that receive a
+`StageRecord` for each finished stage, or use class `Profiler` for collecting all
+records, printing a summary and saving them as JSON trace.
+'''
+from collections import namedtuple
+from contextlib import contextmanager
+
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Record of a finished stage: name, input file, wall time, number of processed bytes,
+# peak memory allocated by Python during the stage (tracemalloc, None if not traced)
+# and peak resident set size of the process (None if not available).
+StageRecord = namedtuple('StageRecord', ['stage', 'file', 'wall_time_s', 'bytes', 'peak_memory_bytes', 'peak_rss_bytes'])
+
+# Registered callbacks.
+_callbacks = []
+
+# Stack of running stages (peak traced memory of each stage so far).
+_running = []
+
+def add_callback(callback):
+    '''
+    Register callback, which is called with a `StageRecord` for each finished stage.
+    '''
+    _callbacks.append(callback)
+
+def remove_callback(callback):
+    '''
+    Unregister callback (see `add_callback`).
+    '''
+    _callbacks.remove(callback)
+
+def peak_rss():
+    '''
+    Peak resident set size of the process in bytes (None if not available).
+    '''
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Given in bytes on macOS, in kilobytes elsewhere.
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+def _reset_peak():
+    # Available since Python 3.9 (otherwise the peak covers everything since tracing started).
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+@contextmanager
+def stage(name, file = None, size = 0):
+    '''
+    Mark a stage of the conversion (e.g., `parse`, `transform` or `emit`) for the
+    given input file, processing `size` bytes. Stages may be nested.
+    '''
+    if not _callbacks:
+        yield
+        return
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Peak memory of the enclosing stage up to now.
+        if _running:
+            _running[-1] = max(_running[-1], tracemalloc.get_traced_memory()[1])
+        _reset_peak()
+
+    _running.append(0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - start
+        peak = _running.pop()
+        if tracing and tracemalloc.is_tracing():
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if _running:
+                _running[-1] = max(_running[-1], peak)
+            _reset_peak()
+        else:
+            peak = None
+
+        record = StageRecord(name, None if file is None else str(file), wall_time, size, peak, peak_rss())
+        for callback in list(_callbacks):
+            callback(record)
+
+class Profiler:
+    '''
+    Collect the records of all stages while active (use as context manager).
+
+    If `trace_memory` is true, memory allocations are traced with tracemalloc (which
+    slows down the conversion considerably).
+    '''
+
+    def __init__(self, trace_memory = True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_callback(self.records.append)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_callback(self.records.append)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def summary(self):
+        '''
+        Aggregate records by stage: number of calls, total wall time, total number of
+        bytes and maximum peak memory. Returns a dict (in order of first occurrence).
+        '''
+        stages = {}
+        for record in self.records:
+            entry = stages.setdefault(record.stage, dict(calls = 0, wall_time_s = 0., bytes = 0,
+                peak_memory_bytes = None, peak_rss_bytes = None))
+            entry['calls'] += 1
+            entry['wall_time_s'] += record.wall_time_s
+            entry['bytes'] += record.bytes
+            for key in ('peak_memory_bytes', 'peak_rss_bytes'):
+                value = getattr(record, key)
+                if value is not None:
+                    entry[key] = max(entry[key] or 0, value)
+        return stages
+
+    def print_summary(self, file = sys.stderr):
+        '''
+        Print summary of all stages (see `summary`).
+        '''
+        print(f'{"stage":<12} {"calls":>6} {"time [ms]":>10} {"bytes":>12} {"MB/s":>9} {"peak [MB]":>10} {"RSS [MB]":>9}', file = file)
+        for (name, entry) in self.summary().items():
+            throughput = entry['bytes'] / entry['wall_time_s'] / 1e6 if entry['wall_time_s'] > 0 else 0.
+            peak = f'{entry["peak_memory_bytes"] / 1e6:.2f}' if entry['peak_memory_bytes'] is not None else '-'
+            rss = f'{entry["peak_rss_bytes"] / 1e6:.1f}' if entry['peak_rss_bytes'] is not None else '-'
+            print(f'{name:<12} {entry["calls"]:>6} {entry["wall_time_s"] * 1e3:>10.2f} {entry["bytes"]:>12} ' +
+                f'{throughput:>9.2f} {peak:>10} {rss:>9}', file = file)
+
+    def save(self, file_name):
+        '''
+        Save all records and the summary as JSON trace.
+        '''
+        with open(file_name, 'w') as file:
+            json.dump(dict(
+                records = [record._asdict() for record in self.records],
+                summary = self.summary(),
+            ), file, indent = 2)
@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+import struct
+
+# Target machine of ELF object files (ELF class, machine and flags).
+ElfMachine = namedtuple('ElfMachine', ['elf_class', 'machine', 'flags'])
+
+# Supported target machines.
+ELF_MACHINES = {
+    'arm': ElfMachine(32, 40, 0x05000000), # EABI version 5
+    'riscv32': ElfMachine(32, 243, 0),
+    'aarch64': ElfMachine(64, 183, 0),
+    'x86_64': ElfMachine(64, 62, 0),
+}
+
+# ELF constants.
+ET_REL = 1
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_STRTAB = 3
+SHF_ALLOC = 0x2
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STT_NOTYPE = 0
+STT_OBJECT = 1
+STT_SECTION = 3
+
+class _StringTable:
+    '''
+    ELF string table (null-terminated strings, starting with an empty string).
+    '''
+    def __init__(self):
+        self.data = bytearray(b'\0')
+
+    def add(self, text):
+        offset = len(self.data)
+        self.data.extend(text.encode('utf-8') + b'\0')
+        return offset
+
+def _align(value, alignment):
+    return value + (-value % alignment)
+
+def elf_object(name, data, machine = 'arm', alignment = 4):
+    '''
+    Create ELF relocatable object file (little-endian) with the data in a read-only
+    section `.rodata.<name>` and the global symbols `<name>` (the data, with size)
+    and `<name>_end` (end of the data). An empty `.note.GNU-stack` section marks
+    the stack as non-executable (for hosted targets). Returns the content of the
+    object file.
+    '''
+    if machine not in ELF_MACHINES:
+        raise RuntimeError(f'Unsupported target machine: {machine}')
+
+    target = ELF_MACHINES[machine]
+    is_64 = target.elf_class == 64
+    word = 'Q' if is_64 else 'I'
+
+    ehdr = struct.Struct('<16sHHI' + word * 3 + 'IHHHHHH')
+    shdr = struct.Struct('<IIQQQQIIQQ' if is_64 else '<IIIIIIIIII')
+    sym = struct.Struct('<IBBHQQ' if is_64 else '<IIIBBH')
+
+    def pack_symbol(name_offset, value, size, info, shndx):
+        if is_64:
+            return sym.pack(name_offset, info, 0, shndx, value, size)
+        return sym.pack(name_offset, value, size, info, 0, shndx)
+
+    # Section names.
+    shstrtab = _StringTable()
+    section_names = [shstrtab.add(n) for n in (f'.rodata.{name}', '.symtab', '.strtab', '.shstrtab', '.note.GNU-stack')]
+
+    # Symbols (local symbols first).
+    strtab = _StringTable()
+    symbols = b''.join([
+        pack_symbol(0, 0, 0, 0, 0),
+        pack_symbol(0, 0, 0, (STB_LOCAL << 4) | STT_SECTION, 1),
+        pack_symbol(strtab.add(name), 0, len(data), (STB_GLOBAL << 4) | STT_OBJECT, 1),
+        pack_symbol(strtab.add(f'{name}_end'), len(data), 0, (STB_GLOBAL << 4) | STT_NOTYPE, 1),
+    ])
+    first_global_symbol = 2
+
+    # File layout: ELF header, data, symbol table, string tables, section headers.
+    word_size = 8 if is_64 else 4
+    data_offset = _align(ehdr.size, alignment)
+    symtab_offset = _align(data_offset + len(data), word_size)
+    strtab_offset = symtab_offset + len(symbols)
+    shstrtab_offset = strtab_offset + len(strtab.data)
+    shdr_offset = _align(shstrtab_offset + len(shstrtab.data), word_size)
+
+    sections = [
+        shdr.pack(0, 0, 0, 0, 0, 0, 0, 0, 0, 0),
+        shdr.pack(section_names[0], SHT_PROGBITS, SHF_ALLOC, 0, data_offset, len(data), 0, 0, alignment, 0),
+        shdr.pack(section_names[1], SHT_SYMTAB, 0, 0, symtab_offset, len(symbols), 3, first_global_symbol, word_size, sym.size),
+        shdr.pack(section_names[2], SHT_STRTAB, 0, 0, strtab_offset, len(strtab.data), 0, 0, 1, 0),
+        shdr.pack(section_names[3], SHT_STRTAB, 0, 0, shstrtab_offset, len(shstrtab.data), 0, 0, 1, 0),
+        shdr.pack(section_names[4], SHT_PROGBITS, 0, 0, shstrtab_offset + len(shstrtab.data), 0, 0, 0, 1, 0),
+    ]
+
+    ident = b'\x7fELF' + bytes([2 if is_64 else 1, 1, 1]) # class, little-endian, version
+    header = ehdr.pack(
+        ident, ET_REL, target.machine, 1, 0, 0, shdr_offset, target.flags,
+        ehdr.size, 0, 0, shdr.size, len(sections), 4
+        )
+
+    out = bytearray(header)
+    out.extend(bytes(data_offset - len(out)))
+    out.extend(data)
+    out.extend(bytes(symtab_offset - len(out)))
+    out.extend(symbols)
+    out.extend(strtab.data)
+    out.extend(shstrtab.data)
+    out.extend(bytes(shdr_offset - len(out)))
+    out.extend(b''.join(sections))
+
+    return bytes(out)
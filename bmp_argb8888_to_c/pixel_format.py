@@ -0,0 +1,327 @@
+from array import array
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Pixel format, with the corresponding color mode of the LTDC/DMA2D and the
+# number of bytes per pixel.
+PixelFormat = namedtuple('PixelFormat', ['name', 'color_mode', 'bytes_per_pixel'])
+
+# Supported target pixel formats.
+PIXEL_FORMATS = {
+    f.name: f for f in (
+        PixelFormat('ARGB8888', 0, 4),
+        PixelFormat('RGB888', 1, 3),
+        PixelFormat('RGB565', 2, 2),
+        PixelFormat('ARGB1555', 3, 2),
+        PixelFormat('ARGB4444', 4, 2),
+        PixelFormat('L8', 5, 1),
+    )
+}
+
+# Supported palette quantizers for L8 (in case the image has too many colors).
+QUANTIZERS = ('median-cut', 'uniform')
+
+def _table(func):
+    # Lookup table for bytes.translate.
+    return bytes(func(v) for v in range(256))
+
+def _scale(bits):
+    # Round 8-bit value to the given number of bits.
+    return lambda v: (v * ((1 << bits) - 1) + 127) // 255
+
+def _or(*planes):
+    # Bitwise OR of byte strings of equal length (using arbitrary-precision integers).
+    value = 0
+    for plane in planes:
+        value |= int.from_bytes(plane, 'little')
+    return value.to_bytes(len(planes[0]), 'little')
+
+def _interleave(*planes):
+    # Interleave byte strings of equal length (e.g., low and high byte of 16-bit values).
+    n = len(planes)
+    out = bytearray(n * len(planes[0]))
+    for (i, plane) in enumerate(planes):
+        out[i::n] = plane
+    return bytes(out)
+
+def _pixel_values(pixel_data):
+    # Pixel array as 32-bit values (0xAARRGGBB).
+    values = array('I')
+    values.frombytes(pixel_data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def _clut_bytes(palette):
+    # Color lookup table as little-endian 32-bit values (0xAARRGGBB).
+    clut = array('I', palette)
+    if sys.byteorder == 'big':
+        clut.byteswap()
+    return clut.tobytes()
+
+# Lookup tables for quantizing color channels.
+_TO_5BIT = _table(_scale(5))
+_TO_6BIT = _table(_scale(6))
+_TO_4BIT = _table(_scale(4))
+
+# Lookup table for reducing color channels to 5 bits (center of each bucket).
+_REDUCE_5BIT = _table(lambda v: (v & 0xF8) | 0x04)
+
+@lru_cache(maxsize = None)
+def _premultiply_table():
+    # Premultiplied color value for each pair of color value and alpha (index: alpha * 256 + color).
+    return bytes((c * a + 127) // 255 for a in range(256) for c in range(256))
+
+def premultiply_alpha(pixel_data):
+    '''
+    Premultiply the color channels of an ARGB8888 pixel array (bytes B, G, R, A for
+    each pixel) by alpha, i.e., round(c * a / 255) for each color value c (alpha is
+    kept). Returns the premultiplied pixel array.
+
+    Uses NumPy if available, otherwise a lookup table indexed by pairs of alpha and
+    color value (applied to whole color planes at once).
+    '''
+    if len(pixel_data) % 4:
+        raise RuntimeError('ARGB8888 pixel array size must be a multiple of 4')
+
+    # Nothing to do for fully opaque images.
+    a = bytes(pixel_data[3::4])
+    if a.count(255) == len(a):
+        return bytes(pixel_data)
+
+    if numpy is not None:
+        pixels = numpy.frombuffer(pixel_data, dtype = numpy.uint8).reshape(-1, 4).astype(numpy.uint16)
+        pixels[:, :3] = (pixels[:, :3] * pixels[:, 3:] + 127) // 255
+        return pixels.astype(numpy.uint8).tobytes()
+
+    table = _premultiply_table()
+    out = bytearray(pixel_data)
+    for i in range(3):
+        # Index into the lookup table (16-bit values, color value in the low byte).
+        index = array('H', _interleave(bytes(pixel_data[i::4]), a))
+        if sys.byteorder == 'big':
+            index.byteswap()
+        out[i::4] = bytes(map(table.__getitem__, index))
+
+    return bytes(out)
+
+def convert_pixels(pixel_data, pixel_format, max_colors = 256, quantizer = 'median-cut'):
+    '''
+    Convert ARGB8888 pixel array (bytes B, G, R, A for each pixel) to the given
+    pixel format. All conversions operate on whole color planes at once (using
+    lookup tables and bitwise operations on byte strings). For L8, the palette is
+    computed from the distinct colors of the image (using NumPy if available).
+
+    Returns the converted pixel array and the color lookup table (CLUT, only for
+    format L8, otherwise None). Multi-byte pixels and CLUT entries (ARGB8888) are
+    stored in little-endian byte order.
+
+    For L8, the palette is exact if the image has at most `max_colors` colors.
+    Otherwise, the colors are quantized, either with the median cut algorithm
+    (`median-cut`) or with a fixed RGB332 palette (`uniform`, opaque colors only).
+    '''
+    if pixel_format not in PIXEL_FORMATS:
+        raise RuntimeError(f'Unsupported pixel format: {pixel_format}')
+
+    if len(pixel_data) % 4:
+        raise RuntimeError('ARGB8888 pixel array size must be a multiple of 4')
+
+    if pixel_format == 'ARGB8888':
+        return (bytes(pixel_data), None)
+
+    if pixel_format == 'L8':
+        return _convert_to_l8(pixel_data, max_colors, quantizer)
+
+    # Color planes.
+    (b, g, r, a) = (bytes(pixel_data[i::4]) for i in range(4))
+
+    if pixel_format == 'RGB888':
+        return (_interleave(b, g, r), None)
+
+    if pixel_format == 'RGB565':
+        # 16-bit value RRRRRGGG GGGBBBBB.
+        g6 = g.translate(_TO_6BIT)
+        low = _or(g6.translate(_table(lambda v: (v << 5) & 0xE0)), b.translate(_TO_5BIT))
+        high = _or(r.translate(_table(lambda v: _scale(5)(v) << 3)), g6.translate(_table(lambda v: v >> 3)))
+        return (_interleave(low, high), None)
+
+    if pixel_format == 'ARGB1555':
+        # 16-bit value ARRRRRGG GGGBBBBB.
+        g5 = g.translate(_TO_5BIT)
+        low = _or(g5.translate(_table(lambda v: (v << 5) & 0xE0)), b.translate(_TO_5BIT))
+        high = _or(
+            a.translate(_table(lambda v: 0x80 if v >= 128 else 0)),
+            r.translate(_table(lambda v: _scale(5)(v) << 2)),
+            g5.translate(_table(lambda v: v >> 3))
+            )
+        return (_interleave(low, high), None)
+
+    if pixel_format == 'ARGB4444':
+        # 16-bit value AAAARRRR GGGGBBBB.
+        shift = _table(lambda v: _scale(4)(v) << 4)
+        low = _or(g.translate(shift), b.translate(_TO_4BIT))
+        high = _or(a.translate(shift), r.translate(_TO_4BIT))
+        return (_interleave(low, high), None)
+
+def _convert_to_l8(pixel_data, max_colors, quantizer):
+    '''
+    Convert ARGB8888 pixel array to L8 (8-bit indices) and color lookup table.
+    '''
+    if not 1 <= max_colors <= 256:
+        raise RuntimeError(f'Number of colors for L8 must be between 1 and 256, got {max_colors}')
+
+    if quantizer not in QUANTIZERS:
+        raise RuntimeError(f'Unknown quantizer: {quantizer}')
+
+    (colors, counts, values) = _color_histogram(pixel_data)
+
+    if len(colors) <= max_colors:
+        # Exact palette.
+        return (_palette_indices(values, colors, range(len(colors))), _clut_bytes([int(color) for color in colors]))
+
+    if quantizer == 'uniform':
+        # Fixed RGB332 palette, index RRRGGGBB (applied to whole color planes).
+        (b, g, r) = (bytes(pixel_data[i::4]) for i in range(3))
+        indices = _or(
+            r.translate(_table(lambda v: _scale(3)(v) << 5)),
+            g.translate(_table(lambda v: _scale(3)(v) << 2)),
+            b.translate(_table(_scale(2)))
+            )
+        palette = [
+            0xFF000000 | (((i >> 5) * 255 // 7) << 16) | ((((i >> 2) & 7) * 255 // 7) << 8) | ((i & 3) * 255 // 3)
+            for i in range(256)
+            ]
+        return (indices, _clut_bytes(palette))
+
+    # Reduce colors to 5 bits per color channel (center of each bucket) before median
+    # cut. Alpha is kept exact, so that transparent and opaque pixels remain so.
+    reduced = bytearray(pixel_data)
+    for i in range(3):
+        reduced[i::4] = bytes(reduced[i::4]).translate(_REDUCE_5BIT)
+    (colors, counts, values) = _color_histogram(reduced)
+    (palette, palette_index) = _median_cut(colors, counts, max_colors)
+
+    return (_palette_indices(values, colors, palette_index), _clut_bytes(palette))
+
+def _color_histogram(pixel_data):
+    '''
+    Retrieve the distinct colors of an ARGB8888 pixel array (sorted 32-bit values), the
+    number of occurrences of each color and the color of each pixel (with NumPy, the
+    index of the color instead).
+    '''
+    if numpy is not None:
+        values = numpy.frombuffer(pixel_data, dtype = '<u4')
+        (colors, inverse, counts) = numpy.unique(values, return_inverse = True, return_counts = True)
+        return (colors, counts, inverse.ravel())
+
+    values = _pixel_values(pixel_data)
+    histogram = Counter(values)
+    colors = sorted(histogram)
+    return (colors, [histogram[color] for color in colors], values)
+
+def _palette_indices(values, colors, palette_index):
+    '''
+    Map the color of each pixel (see `_color_histogram`) to the palette index of its color.
+    '''
+    if numpy is not None:
+        return numpy.asarray(palette_index, dtype = numpy.uint8)[values].tobytes()
+
+    mapping = dict(zip(colors, palette_index))
+    return bytes(map(mapping.__getitem__, values))
+
+def _channels(color):
+    # Split 32-bit value into channels (A, R, G, B).
+    return ((color >> 24) & 0xFF, (color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+
+def _median_cut(colors, counts, max_colors):
+    '''
+    Quantize colors (sorted 32-bit values, with number of occurrences) with the median
+    cut algorithm. Returns the palette and the palette index of each color.
+
+    Each box keeps the range of its channels, which is computed once when the box is
+    created. Uses NumPy if available (same result as without).
+    '''
+    if numpy is not None:
+        # Channels (A, R, G, B) of each color, one row per channel.
+        channels = numpy.stack([(numpy.asarray(colors) >> shift).astype(numpy.uint8) for shift in (24, 16, 8, 0)])
+        weights = numpy.asarray(counts, dtype = numpy.int64)
+
+        def make_box(members):
+            box = channels[:, members]
+            spreads = box.max(axis = 1).astype(int) - box.min(axis = 1)
+            c = int(spreads.argmax())
+            return (int(spreads[c]), c, members)
+
+        def split_box(members, c):
+            # Sort colors along the channel (stable) and split at the weighted median.
+            members = members[numpy.argsort(channels[c, members], kind = 'stable')]
+            half = weights[members].sum() / 2
+            acc = numpy.cumsum(weights[members][:-1])
+            split = min(int(numpy.searchsorted(acc, half)) + 1, len(members) - 1)
+            return (members[:split], members[split:])
+
+        def mean_color(members):
+            total = int(weights[members].sum())
+            sums = channels[:, members].astype(numpy.int64) @ weights[members]
+            return [(int(v) + total // 2) // total for v in sums]
+
+        boxes = [make_box(numpy.arange(len(colors)))]
+        palette_index = numpy.zeros(len(colors), dtype = numpy.uint8)
+    else:
+        channels = [_channels(color) for color in colors]
+
+        def make_box(members):
+            spreads = [
+                max(channels[k][c] for k in members) - min(channels[k][c] for k in members) for c in range(4)
+                ]
+            spread = max(spreads)
+            return (spread, spreads.index(spread), members)
+
+        def split_box(members, c):
+            # Sort colors along the channel (stable) and split at the weighted median.
+            members = sorted(members, key = lambda k: channels[k][c])
+            half = sum(counts[k] for k in members) / 2
+            (acc, split) = (0, 1)
+            for (i, k) in enumerate(members[:-1]):
+                acc += counts[k]
+                split = i + 1
+                if acc >= half:
+                    break
+            return (members[:split], members[split:])
+
+        def mean_color(members):
+            total = sum(counts[k] for k in members)
+            return [(sum(channels[k][c] * counts[k] for k in members) + total // 2) // total for c in range(4)]
+
+        boxes = [make_box(list(range(len(colors))))]
+        palette_index = array('B', bytes(len(colors)))
+
+    while len(boxes) < max_colors:
+        # Find box with the largest range.
+        i = max(range(len(boxes)), key = lambda k: boxes[k][0])
+        (spread, c, members) = boxes[i]
+
+        if spread == 0:
+            break
+
+        boxes[i:i+1] = [make_box(part) for part in split_box(members, c)]
+
+    palette = []
+    for (index, (_, _, members)) in enumerate(boxes):
+        # Palette color is the weighted mean of all colors in the box.
+        mean = mean_color(members)
+        palette.append((mean[0] << 24) | (mean[1] << 16) | (mean[2] << 8) | mean[3])
+        if numpy is not None:
+            palette_index[members] = index
+        else:
+            for k in members:
+                palette_index[k] = index
+
+    return (palette, palette_index)
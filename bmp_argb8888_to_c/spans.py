@@ -0,0 +1,73 @@
+from bmp_argb8888_to_c.template import SPAN_TABLE_TEMPLATE
+from bmp_argb8888_to_c.util import format_c_array_values
+
+from collections import namedtuple
+
+import re
+
+# Kinds of spans: fully transparent (skip), fully opaque (copy) and semi-transparent
+# (blend) pixels.
+SPAN_TRANSPARENT = 0
+SPAN_OPAQUE = 1
+SPAN_BLENDED = 2
+SPAN_KINDS = ('transparent', 'opaque', 'blended')
+
+# Each span is a 16-bit value: kind (upper 2 bits) and length in pixels (lower 14 bits).
+SPAN_LENGTH_BITS = 14
+MAX_SPAN_LENGTH = (1 << SPAN_LENGTH_BITS) - 1
+
+# Span table: spans of all rows, index of the first span of each row (plus total
+# number of spans) and number of pixels of each kind.
+SpanTable = namedtuple('SpanTable', ['spans', 'row_offsets', 'counts'])
+
+# Runs of pixels of the same kind.
+_RUNS = re.compile(rb'\x00+|\x01+|\x02+')
+
+def span_table(alpha, width, height, opaque = 255):
+    '''
+    Split each row of alpha values (one per byte, row by row) into spans of fully
+    transparent (0), fully opaque (at least `opaque`, e.g., the maximum level of
+    quantized alpha) and semi-transparent pixels. Returns a `SpanTable`.
+
+    Spans longer than `MAX_SPAN_LENGTH` pixels are split.
+    '''
+    classes = bytes(
+        SPAN_TRANSPARENT if a == 0 else SPAN_OPAQUE if a >= opaque else SPAN_BLENDED for a in range(256)
+        )
+    kinds = bytes(alpha[:width * height]).translate(classes)
+
+    spans = []
+    row_offsets = [0]
+    for y in range(height):
+        for run in _RUNS.finditer(kinds, y * width, (y + 1) * width):
+            kind = kinds[run.start()]
+            for start in range(run.start(), run.end(), MAX_SPAN_LENGTH):
+                spans.append(kind << SPAN_LENGTH_BITS | (min(run.end() - start, MAX_SPAN_LENGTH)))
+        row_offsets.append(len(spans))
+
+    counts = [kinds.count(kind) for kind in range(len(SPAN_KINDS))]
+    return SpanTable(spans, row_offsets, counts)
+
+def span_fractions(table):
+    '''
+    Retrieve fraction of pixels of each kind (dict, e.g., `transparent_pixels`).
+    '''
+    total = max(sum(table.counts), 1)
+    return {f'{kind}_pixels': count / total for (kind, count) in zip(SPAN_KINDS, table.counts)}
+
+def format_span_table(name, table, row_order):
+    '''
+    Generate C arrays for a span table (see `SPAN_TABLE_TEMPLATE`).
+    '''
+    fractions = span_fractions(table)
+    return SPAN_TABLE_TEMPLATE.format(
+        name = name,
+        row_order = row_order,
+        span_count = len(table.spans),
+        row_count = len(table.row_offsets) - 1,
+        spans = format_c_array_values([f'0x{span:04X}' for span in table.spans]),
+        span_rows = format_c_array_values(table.row_offsets),
+        transparent = fractions['transparent_pixels'],
+        opaque = fractions['opaque_pixels'],
+        blended = fractions['blended_pixels'],
+    )
@@ -4,12 +4,12 @@ ELEMENT_SEPARATOR = str(' ')
 # Separator for lines in template.
 TEMPLATE_LINE_SEPARATOR = str('\n  ')
 
-# Template for C array (with include guards).
-ARRAY_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+# Template for C array (with include guards), part before the pixel array.
+ARRAY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
 #ifndef {guard}
 #define {guard}
 
-const unsigned char {name}[{array_size}UL + 1] __attribute__ ((aligned (4)))
+{metadata}const unsigned char {name}[{array_size}UL + 1] __attribute__ ((aligned ({alignment}))) =
 {{
   // BITMAP FILE HEADER
   {signature}// SIGNATURE
@@ -39,17 +39,51 @@ const unsigned char {name}[{array_size}UL + 1] __attribute__ ((aligned (4)))
   {gap}// GAP
 
   // PIXEL ARRAY
-  {pixel_array}
+  '''
+
+# Template for C array (with include guards), part after the pixel array.
+ARRAY_FOOTER_TEMPLATE = '''
 
   0x00 // EOF
 }};
 
-#endif // {guard}
+{spans}#endif // {guard}
 '''
 
+# Template for C array (with include guards).
+ARRAY_TEMPLATE = ARRAY_HEADER_TEMPLATE + '{pixel_array}' + ARRAY_FOOTER_TEMPLATE
 
-# Template for C array for anti-aliased fonts (with include guards).
-FONT_ARRAY_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+
+# Template for transparency span table (spans of fully transparent, fully opaque and
+# semi-transparent pixels of each row).
+SPAN_TABLE_TEMPLATE = '''#ifndef BMP_SPAN_
+#define BMP_SPAN_
+#include <stdint.h>
+// Span of pixels of the same kind: kind (upper 2 bits) and length in pixels (lower 14 bits).
+#define BMP_SPAN_TRANSPARENT 0 // fully transparent (skip)
+#define BMP_SPAN_OPAQUE 1 // fully opaque (copy)
+#define BMP_SPAN_BLENDED 2 // semi-transparent (blend)
+#define BMP_SPAN_KIND(span) ((span) >> 14)
+#define BMP_SPAN_LENGTH(span) ((span) & 0x3FFF)
+#endif // BMP_SPAN_
+
+// Transparency spans of each row (rows from {row_order}),
+// pixels: {transparent:.1%} transparent, {opaque:.1%} opaque, {blended:.1%} blended.
+const uint16_t {name}_spans[{span_count}] =
+{{
+  {spans}
+}};
+
+// Spans of row i are {name}_spans[{name}_span_rows[i]] to {name}_spans[{name}_span_rows[i + 1] - 1].
+const uint32_t {name}_span_rows[{row_count} + 1] =
+{{
+  {span_rows}
+}};
+
+'''
+
+# Template for C array for anti-aliased fonts (with include guards), part before the fonts.
+FONT_ARRAY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
 #ifndef T_FONT_AA_
 #define T_FONT_AA_
 // Struct for anti-aliased monospace fonts.
@@ -58,22 +92,499 @@ typedef struct _tFont_AA
   const uint8_t *table;
   uint16_t width;
   uint16_t height;
+  uint8_t bpp;
 }} sFONT_AA;
 #endif // T_FONT_AA_
 
 const uint8_t {name}_table[] =
-{{{fonts_array}
+{{'''
+
+# Template for C array for anti-aliased fonts (with include guards), part after the fonts.
+FONT_ARRAY_FOOTER_TEMPLATE = '''
   0x00 // end of array
 }};
 
 sFONT_AA {name} = {{
   {name}_table,
   {font_width}, // font width
-  {font_heigth} // font height
+  {font_heigth}, // font height
+  {bpp} // bits per pixel
 }};
 '''
 
+# Template for C array for anti-aliased fonts (with include guards).
+FONT_ARRAY_TEMPLATE = FONT_ARRAY_HEADER_TEMPLATE + '{fonts_array}' + FONT_ARRAY_FOOTER_TEMPLATE
+
 SINGLE_FONT_TEMPLATE = '''
   // @{pos}
   {font_data}
-'''
\ No newline at end of file
+'''
+
+# Template for C array for compact anti-aliased fonts (cropped and deduplicated glyphs), part before the glyphs.
+COMPACT_FONT_ARRAY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef T_FONT_AA_COMPACT_
+#define T_FONT_AA_COMPACT_
+// Struct for a glyph of a compact anti-aliased font (bounding box of the
+// non-transparent pixels, relative to the top left corner of the glyph cell).
+typedef struct _tGlyph_AA
+{{
+  uint32_t offset; // offset of the cropped glyph in the table
+  uint8_t x; // left bearing
+  uint8_t y; // top bearing
+  uint8_t width;
+  uint8_t height;
+}} sGLYPH_AA;
+
+// Struct for compact anti-aliased monospace fonts.
+typedef struct _tFontCompact_AA
+{{
+  const uint8_t *table;
+  const sGLYPH_AA *glyphs;
+  uint16_t width;
+  uint16_t height;
+  uint16_t count;
+  uint8_t bpp;
+}} sFONT_AA_COMPACT;
+#endif // T_FONT_AA_COMPACT_
+
+const uint8_t {name}_table[] =
+{{'''
+
+# Template for C array for compact anti-aliased fonts, part after the glyphs.
+COMPACT_FONT_ARRAY_FOOTER_TEMPLATE = '''
+  0x00 // end of array
+}};
+
+const sGLYPH_AA {name}_glyphs[{count}] =
+{{
+  {glyphs}
+}};
+
+sFONT_AA_COMPACT {name} = {{
+  {name}_table,
+  {name}_glyphs,
+  {font_width}, // font width
+  {font_heigth}, // font height
+  {count}, // number of glyphs
+  {bpp} // bits per pixel
+}};
+'''
+
+SINGLE_COMPACT_FONT_TEMPLATE = '''
+  // @{pos} (glyph {glyph_indices})
+  {font_data}
+'''
+
+# Template for font pack (several anti-aliased monospace fonts in a single translation
+# unit, sharing one glyph table), part before the glyphs.
+FONT_PACK_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef T_FONT_AA_PACK_
+#define T_FONT_AA_PACK_
+// Struct for a range of consecutive characters of a font.
+typedef struct _tFontRange_AA
+{{
+  uint32_t first; // code of the first character
+  uint16_t count; // number of characters
+  uint16_t glyph; // index of the glyph of the first character
+}} sFONT_AA_RANGE;
+
+// Struct for anti-aliased monospace fonts of a font pack.
+typedef struct _tFontPack_AA
+{{
+  const uint8_t *table; // glyphs of the font (within the table of the font pack)
+  const sFONT_AA_RANGE *ranges;
+  uint32_t glyph_size; // bytes per glyph
+  uint16_t width;
+  uint16_t height;
+  uint16_t count; // number of glyphs
+  uint8_t bpp;
+  uint8_t n_ranges;
+}} sFONT_AA_PACK;
+
+// Retrieve transparency information of a character (NULL if not contained in the font).
+static inline const uint8_t *font_aa_pack_glyph(const sFONT_AA_PACK *font, uint32_t c)
+{{
+  for (uint8_t i = 0; i < font->n_ranges; ++i)
+  {{
+    const sFONT_AA_RANGE *range = &font->ranges[i];
+    if (c >= range->first && c - range->first < range->count)
+      return font->table + (range->glyph + (c - range->first)) * font->glyph_size;
+  }}
+  return (const uint8_t *)0;
+}}
+#endif // T_FONT_AA_PACK_
+
+// Font IDs (index into {name}).
+enum {{
+  {font_ids}
+  {upper_name}_COUNT = {count}
+}};
+
+const uint8_t {name}_table[] =
+{{'''
+
+# Template for font pack, part after the glyphs.
+FONT_PACK_FOOTER_TEMPLATE = '''
+  0x00 // end of array
+}};
+
+const sFONT_AA_RANGE {name}_ranges[] =
+{{
+  {ranges}
+}};
+
+const sFONT_AA_PACK {name}[{count}] =
+{{
+  {fonts}
+}};
+'''
+
+SINGLE_FONT_PACK_TEMPLATE = '''
+  // @{pos} ({font}, character {char})
+  {font_data}
+'''
+
+# Template for C array of converted pixel data (with include guards), part before the pixel array.
+PIXEL_ARRAY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef {guard}
+#define {guard}
+
+#define {upper_name}_WIDTH {width} // image width (pixels)
+#define {upper_name}_HEIGHT {height} // image height (pixels)
+#define {upper_name}_FORMAT {color_mode} // pixel format ({pixel_format}, LTDC/DMA2D color mode)
+#define {upper_name}_STRIDE {stride} // bytes per row
+{clut_size_define}
+const unsigned char {name}[{array_size}UL] __attribute__ ((aligned (4))) =
+{{
+  // PIXEL ARRAY ({pixel_format}, rows from {row_order})
+  '''
+
+# Template for C array of converted pixel data (with include guards), part after the pixel array.
+PIXEL_ARRAY_FOOTER_TEMPLATE = '''
+}};
+{clut}
+#endif // {guard}
+'''
+
+# Template for size of color lookup table (only for pixel formats with CLUT).
+CLUT_SIZE_DEFINE_TEMPLATE = '''#define {upper_name}_CLUT_SIZE {clut_size} // number of CLUT entries
+'''
+
+# Template for color lookup table (only for pixel formats with CLUT).
+CLUT_TEMPLATE = '''
+const unsigned char {name}_clut[{clut_bytes}UL] __attribute__ ((aligned (4))) =
+{{
+  // COLOR LOOKUP TABLE (ARGB8888)
+  {clut_array}
+}};
+'''
+
+
+# Template for portable C decoders of compressed pixel arrays (included once per translation unit).
+DECODER_TEMPLATE = '''#ifndef BMP_ARGB8888_TO_C_DECODERS_
+#define BMP_ARGB8888_TO_C_DECODERS_
+#include <stdint.h>
+#include <string.h>
+
+#define BMP_COMPRESSION_RLE 1
+#define BMP_COMPRESSION_LZ4 2
+
+// Decode one RLE-compressed row of 32-bit pixels from [src, end) to dst.
+// Returns the number of decoded bytes.
+static inline uint32_t bmp_rle_decode_row(const uint8_t *src, const uint8_t *end, uint8_t *dst)
+{{
+  uint8_t *start = dst;
+  while (src < end)
+  {{
+    uint8_t header = *src++;
+    uint32_t count = (header & 0x7Fu) + 1u;
+    if (header & 0x80u)
+    {{
+      // Run of identical pixels.
+      while (count--)
+      {{
+        memcpy(dst, src, 4);
+        dst += 4;
+      }}
+      src += 4;
+    }}
+    else
+    {{
+      // Literal pixels.
+      memcpy(dst, src, 4u * count);
+      dst += 4u * count;
+      src += 4u * count;
+    }}
+  }}
+  return (uint32_t)(dst - start);
+}}
+
+// Decode one LZ4-compressed row (LZ4 block format) from [src, end) to dst.
+// Returns the number of decoded bytes.
+static inline uint32_t bmp_lz4_decode_row(const uint8_t *src, const uint8_t *end, uint8_t *dst)
+{{
+  uint8_t *start = dst;
+  while (src < end)
+  {{
+    uint8_t token = *src++;
+
+    // Literals.
+    uint32_t length = token >> 4;
+    if (length == 15u)
+    {{
+      uint8_t b;
+      do {{ b = *src++; length += b; }} while (b == 255u);
+    }}
+    memcpy(dst, src, length);
+    dst += length;
+    src += length;
+    if (src >= end) break;
+
+    // Match (may overlap with its own output, so copy byte by byte).
+    uint32_t offset = (uint32_t)src[0] | ((uint32_t)src[1] << 8);
+    src += 2;
+    length = token & 0x0Fu;
+    if (length == 15u)
+    {{
+      uint8_t b;
+      do {{ b = *src++; length += b; }} while (b == 255u);
+    }}
+    length += 4u;
+    const uint8_t *match = dst - offset;
+    while (length--) *dst++ = *match++;
+  }}
+  return (uint32_t)(dst - start);
+}}
+
+// Decode row of a compressed pixel array (given compression method, data and row offsets) to dst.
+static inline uint32_t bmp_decode_row(int method, const uint8_t *data, const uint32_t *rows, uint32_t row, uint8_t *dst)
+{{
+  const uint8_t *src = data + rows[row];
+  const uint8_t *end = data + rows[row + 1];
+  return (method == BMP_COMPRESSION_RLE) ? bmp_rle_decode_row(src, end, dst) : bmp_lz4_decode_row(src, end, dst);
+}}
+#endif // BMP_ARGB8888_TO_C_DECODERS_
+'''
+
+# Template for compressed C array (with include guards), part before the compressed pixel array.
+COMPRESSED_ARRAY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef {guard}
+#define {guard}
+
+{decoder}
+#define {upper_name}_WIDTH {width} // image width (pixels)
+#define {upper_name}_HEIGHT {height} // image height (pixels)
+#define {upper_name}_STRIDE {stride} // bytes per decoded row
+#define {upper_name}_COMPRESSION {compression_id} // compression method ({method})
+#define {upper_name}_RAW_SIZE {raw_size}UL // size of decoded pixel array (bytes)
+#define {upper_name}_SIZE {array_size}UL // size of compressed pixel array (bytes), ratio {ratio:.2f}
+
+const unsigned char {name}[{array_size}UL] __attribute__ ((aligned (4))) =
+{{
+  // COMPRESSED PIXEL ARRAY (ARGB8888, {method}, rows from {row_order})
+  '''
+
+# Template for compressed C array (with include guards), part after the compressed pixel array.
+COMPRESSED_ARRAY_FOOTER_TEMPLATE = '''
+}};
+
+// Offset of each compressed row (row i is stored from {name}_rows[i] to {name}_rows[i + 1]).
+const uint32_t {name}_rows[{upper_name}_HEIGHT + 1] =
+{{
+  {row_offsets}
+}};
+
+#endif // {guard}
+'''
+
+
+# Template for metadata of C array or binary data with custom alignment or row stride.
+ALIGNED_METADATA_TEMPLATE = '''#define {upper_name}_ALIGNMENT {alignment} // alignment of the data and of the pixel array (bytes)
+#define {upper_name}_PIXEL_OFFSET {pixel_offset} // offset of the pixel array (bytes)
+#define {upper_name}_STRIDE {stride} // bytes per row of the pixel array (including padding)
+'''
+
+# Template for metadata of C array with premultiplied alpha.
+PREMULTIPLIED_METADATA_TEMPLATE = '''#define {upper_name}_PREMULTIPLIED 1 // color channels premultiplied by alpha
+'''
+
+# Template for tiled C array (with include guards), part before the unique tiles.
+TILED_ARRAY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef {guard}
+#define {guard}
+#include <stdint.h>
+
+#define {upper_name}_WIDTH {width} // image width (pixels)
+#define {upper_name}_HEIGHT {height} // image height (pixels)
+#define {upper_name}_TILE_SIZE {tile_size} // tile width and height (pixels)
+#define {upper_name}_TILE_STRIDE {tile_stride} // bytes per row of a tile
+#define {upper_name}_TILE_BYTES {tile_bytes} // bytes per tile
+#define {upper_name}_TILES_X {tiles_x} // number of tiles per row
+#define {upper_name}_TILES_Y {tiles_y} // number of tile rows
+#define {upper_name}_TILE_COUNT {tile_count} // number of unique tiles, dedup ratio {ratio:.2f}
+
+const unsigned char {name}_tiles[{array_size}UL] __attribute__ ((aligned (4))) =
+{{
+  // UNIQUE TILES (ARGB8888, rows from top to bottom)
+  '''
+
+# Template for tiled C array (with include guards), part after the unique tiles.
+TILED_ARRAY_FOOTER_TEMPLATE = '''
+}};
+
+// Index of the unique tile for each tile position (rows of tiles from top to bottom).
+const {map_type} {name}_map[{upper_name}_TILES_Y * {upper_name}_TILES_X] __attribute__ ((aligned (4))) =
+{{
+  {tile_map}
+}};
+
+// Start of the tile at tile position (x, y), counted from the top left.
+#define {upper_name}_TILE(x, y) ({name}_tiles + (uint32_t){name}_map[(y) * {upper_name}_TILES_X + (x)] * {upper_name}_TILE_BYTES)
+
+#endif // {guard}
+'''
+
+# Template for header file declaring binary data (with include guards).
+BINARY_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef {guard}
+#define {guard}
+
+#define {upper_name}_SIZE {array_size}UL // size of binary data (bytes)
+{metadata}
+// Binary data ({alignment}-byte aligned) and its end.
+extern const unsigned char {name}[{upper_name}_SIZE];
+extern const unsigned char {name}_end[];
+
+#endif // {guard}
+'''
+
+# Template for assembler stub including binary data (GNU assembler).
+INCBIN_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+  .section .rodata.{name},"a",%progbits
+  .balign {alignment}
+  .global {name}
+  .type {name}, %object
+{name}:
+  .incbin "{bin_file}"
+  .global {name}_end
+{name}_end:
+  .size {name}, {name}_end - {name}
+  .section .note.GNU-stack,"",%progbits
+'''
+
+# Template for C descriptor of an asset bundle (with include guards).
+BUNDLE_HEADER_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef {guard}
+#define {guard}
+#include <stdint.h>
+
+#ifndef T_BMP_BUNDLE_
+#define T_BMP_BUNDLE_
+// Header of an asset bundle (followed by the index table).
+typedef struct _tBmpBundleHeader
+{{
+  char magic[4];
+  uint16_t version;
+  uint16_t count;
+  uint32_t alignment;
+}} sBMP_BUNDLE_HEADER;
+
+// Entry of the index table (offset from the start of the bundle).
+typedef struct _tBmpBundleEntry
+{{
+  uint32_t offset;
+  uint32_t size;
+  uint16_t width;
+  uint16_t height;
+  uint8_t format;
+  uint8_t reserved;
+  uint16_t count;
+}} sBMP_BUNDLE_ENTRY;
+
+// Asset formats (color modes of the LTDC/DMA2D where available).
+{format_defines}
+
+// Index table entry and data of an asset, given the start of the bundle and the asset ID.
+#define BMP_BUNDLE_ENTRY(bundle, id) (((const sBMP_BUNDLE_ENTRY *)((const uint8_t *)(bundle) + sizeof(sBMP_BUNDLE_HEADER))) + (id))
+#define BMP_BUNDLE_ASSET(bundle, id) ((const uint8_t *)(bundle) + BMP_BUNDLE_ENTRY(bundle, id)->offset)
+#endif // T_BMP_BUNDLE_
+
+#define {upper_name}_SIZE {bundle_size}UL // size of the bundle (bytes)
+#define {upper_name}_ALIGNMENT {alignment} // alignment of the bundle and of each asset (bytes)
+#define {upper_name}_COUNT {count} // number of assets
+
+// Asset IDs (index into the index table).
+enum
+{{
+  {asset_ids}
+}};
+
+#endif // {guard}
+'''
+
+# Template for C header with sector CRC manifest and delta decoder (with include guards).
+DELTA_MANIFEST_TEMPLATE = '''/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef {guard}
+#define {guard}
+#include <stdint.h>
+#include <string.h>
+
+#ifndef T_BMP_DELTA_
+#define T_BMP_DELTA_
+// Header of a delta (followed by the ranges, each one followed by its data).
+typedef struct _tBmpDeltaHeader
+{{
+  char magic[4];
+  uint16_t version;
+  uint16_t reserved;
+  uint32_t block_size;
+  uint32_t old_size;
+  uint32_t new_size;
+  uint32_t old_crc;
+  uint32_t new_crc;
+  uint32_t count;
+}} sBMP_DELTA_HEADER;
+
+// Range of changed data (offset and length in bytes).
+typedef struct _tBmpDeltaRange
+{{
+  uint32_t offset;
+  uint32_t length;
+}} sBMP_DELTA_RANGE;
+
+// Callback for writing changed data (e.g., erase and program flash).
+typedef void (*bmp_delta_write_fn)(uint32_t offset, const uint8_t *data, uint32_t length, void *context);
+
+// Apply delta by calling write for each range. Returns the number of ranges or -1 for an invalid delta.
+static inline int32_t bmp_delta_apply(const uint8_t *delta, bmp_delta_write_fn write, void *context)
+{{
+  sBMP_DELTA_HEADER header;
+  memcpy(&header, delta, sizeof(header));
+  if (memcmp(header.magic, "BMPD", 4) != 0 || header.version != 1) return -1;
+
+  const uint8_t *src = delta + sizeof(header);
+  for (uint32_t i = 0; i < header.count; i++)
+  {{
+    sBMP_DELTA_RANGE range;
+    memcpy(&range, src, sizeof(range));
+    src += sizeof(range);
+    write(range.offset, src, range.length, context);
+    src += range.length;
+  }}
+  return (int32_t)header.count;
+}}
+#endif // T_BMP_DELTA_
+
+#define {upper_name}_SIZE {size}UL // size of the new version (bytes)
+#define {upper_name}_CRC 0x{crc:08X}UL // CRC-32 of the new version
+#define {upper_name}_SECTOR_SIZE {sector_size}UL // sector size (bytes)
+#define {upper_name}_SECTOR_COUNT {sector_count} // number of sectors
+
+// CRC-32 (IEEE 802.3) of each sector of the new version (the last sector might be shorter).
+const uint32_t {name}_sector_crc[{upper_name}_SECTOR_COUNT] =
+{{
+  {sector_crcs}
+}};
+
+#endif // {guard}
+'''
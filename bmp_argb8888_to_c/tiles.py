@@ -0,0 +1,44 @@
+from collections import namedtuple
+
+# Tiled pixel array: unique tiles (each stored contiguously, rows from top to
+# bottom) and tile map (index of the unique tile for each tile position, rows of
+# tiles from top to bottom).
+TiledPixels = namedtuple('TiledPixels', ['tile_size', 'tiles_x', 'tiles_y', 'tiles', 'tile_map'])
+
+def split_tiles(pixel_data, width, height, tile_size, top_down = False, bytes_per_pixel = 4):
+    '''
+    Split pixel array (rows from bottom to top, unless `top_down` is true) into
+    square tiles of `tile_size` pixels and store identical tiles only once.
+
+    Tiles at the right and bottom border are padded with zeros (transparent) if
+    the image size is not a multiple of the tile size.
+    '''
+    if tile_size < 1:
+        raise RuntimeError(f'Invalid tile size: {tile_size}')
+
+    tiles_x = -(-width // tile_size)
+    tiles_y = -(-height // tile_size)
+    row_size = width * bytes_per_pixel
+    tile_row_size = tile_size * bytes_per_pixel
+    padded_row_size = tiles_x * tile_row_size
+
+    # Rows of the image from top to bottom (padded to a multiple of the tile size).
+    lines = range(height) if top_down else reversed(range(height))
+    rows = [bytes(pixel_data[y * row_size:(y + 1) * row_size]).ljust(padded_row_size, b'\0') for y in lines]
+    rows.extend([bytes(padded_row_size)] * (tiles_y * tile_size - height))
+
+    tiles = bytearray()
+    indices = {}
+    tile_map = []
+    for ty in range(tiles_y):
+        band = rows[ty * tile_size:(ty + 1) * tile_size]
+        for tx in range(tiles_x):
+            start = tx * tile_row_size
+            tile = b''.join(row[start:start + tile_row_size] for row in band)
+            index = indices.get(tile)
+            if index is None:
+                index = indices[tile] = len(indices)
+                tiles.extend(tile)
+            tile_map.append(index)
+
+    return TiledPixels(tile_size, tiles_x, tiles_y, bytes(tiles), tile_map)
@@ -0,0 +1,94 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Supported transforms of the image (rotations are clockwise).
+TRANSFORMS = ('flip-h', 'flip-v', 'rotate-90', 'rotate-180', 'rotate-270')
+
+# Transforms that swap width and height.
+ROTATIONS_90 = ('rotate-90', 'rotate-270')
+
+# Array type codes for pixels of 1, 2 or 4 bytes.
+_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+
+def check_transform(transform):
+    '''
+    Check that the transform is supported (or None).
+    '''
+    if transform is not None and transform not in TRANSFORMS:
+        raise RuntimeError(f'Unsupported transform: {transform}, expected one of {TRANSFORMS}')
+
+def transform_size(width, height, transform = None):
+    '''
+    Retrieve width and height of the image after the transform.
+    '''
+    return (height, width) if transform in ROTATIONS_90 else (width, height)
+
+def transform_pixels(pixel_data, width, height, transform = None, top_down = False, output_top_down = False,
+        bytes_per_pixel = 4):
+    '''
+    Apply transform (see `TRANSFORMS`, or None) to the whole pixel array and store
+    the rows of the result in the given order. The input rows are from bottom to
+    top, unless `top_down` is true (same for the output and `output_top_down`).
+    Rows must not be padded.
+
+    Uses NumPy if available, otherwise (strided) slicing of arrays of pixels.
+    '''
+    check_transform(transform)
+
+    size = width * height * bytes_per_pixel
+    if len(pixel_data) < size:
+        raise RuntimeError(f'Pixel array too small: expected {size} bytes, got {len(pixel_data)}')
+
+    if numpy is not None:
+        image = numpy.frombuffer(pixel_data, dtype = numpy.uint8, count = size).reshape(height, width, bytes_per_pixel)
+        # Rows from top to bottom.
+        if not top_down:
+            image = image[::-1]
+        if transform == 'flip-h':
+            image = image[:, ::-1]
+        elif transform == 'flip-v':
+            image = image[::-1]
+        elif transform == 'rotate-90':
+            image = numpy.rot90(image, -1)
+        elif transform == 'rotate-180':
+            image = image[::-1, ::-1]
+        elif transform == 'rotate-270':
+            image = numpy.rot90(image, 1)
+        if not output_top_down:
+            image = image[::-1]
+        return numpy.ascontiguousarray(image).tobytes()
+
+    pixels = array(_TYPECODES[bytes_per_pixel])
+    pixels.frombytes(bytes(pixel_data[:size]))
+
+    # Rows from top to bottom.
+    rows = [pixels[y * width:(y + 1) * width] for y in range(height)]
+    if not top_down:
+        rows.reverse()
+
+    if transform == 'flip-h':
+        rows = [row[::-1] for row in rows]
+    elif transform == 'flip-v':
+        rows.reverse()
+    elif transform in ('rotate-90', 'rotate-270'):
+        # Columns of the image (from top to bottom) become rows.
+        image = array(pixels.typecode, b''.join(row.tobytes() for row in rows))
+        if transform == 'rotate-90':
+            rows = [image[x::width][::-1] for x in range(width)]
+        else:
+            rows = [image[x::width] for x in reversed(range(width))]
+    elif transform == 'rotate-180':
+        rows = [row[::-1] for row in reversed(rows)]
+
+    if not output_top_down:
+        rows.reverse()
+
+    out = array(pixels.typecode)
+    for row in rows:
+        out.extend(row)
+
+    return out.tobytes()
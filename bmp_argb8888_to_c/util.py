@@ -1,7 +1,12 @@
 from bmp_argb8888_to_c.template import TEMPLATE_LINE_SEPARATOR, ELEMENT_SEPARATOR
 
+from contextlib import contextmanager
+from pathlib import Path
 from re import match
 
+import os
+import tempfile
+
 def convert_little_endian_hex_to_decimal(str_hex):
     len_hex = len(str_hex)
 
@@ -50,6 +55,48 @@ def convert_hex_string_to_c_array_elements(str_hex):
 
     return array
 
+# Precomputed C array element for each byte value (e.g., 0xFF).
+C_ARRAY_ELEMENTS = tuple('0x{:02X}'.format(b) for b in range(256))
+
+# Precomputed C array element followed by separator for each byte value (e.g., 0xFF, ).
+C_ARRAY_ELEMENTS_SEPARATED = tuple(e + ',' + ELEMENT_SEPARATOR for e in C_ARRAY_ELEMENTS)
+
+def format_c_array_elements(data):
+    # Convert each byte to a C array element followed by a separator (e.g., 0xFF, ).
+    return ''.join(map(C_ARRAY_ELEMENTS_SEPARATED.__getitem__, data))
+
+def iter_c_array_rows(data, n=12):
+    # Row separator (between elements of the same row).
+    separator = ',' + ELEMENT_SEPARATOR
+
+    # Convert n bytes at a time to a row of C array elements (e.g., 0x00, 0xFF,).
+    for i in range(0, len(data), n):
+        row = data[i:i+n]
+        if len(row) == n:
+            yield separator.join(map(C_ARRAY_ELEMENTS.__getitem__, row)) + ','
+        else:
+            # Incomplete last row ends with separator (same as blockify).
+            yield ''.join(map(C_ARRAY_ELEMENTS_SEPARATED.__getitem__, row))
+
+def format_c_array_rows(data, n=12):
+    # Return blocked C array (same format as blockify).
+    return TEMPLATE_LINE_SEPARATOR.join(iter_c_array_rows(data, n))
+
+def write_c_array_rows(file, data, n=12, rows_per_chunk=4096):
+    # Write blocked C array (same format as format_c_array_rows) chunk by chunk,
+    # so that memory usage does not depend on the size of the data.
+    chunk_size = n * rows_per_chunk
+    for start in range(0, len(data), chunk_size):
+        if start:
+            file.write(TEMPLATE_LINE_SEPARATOR)
+        file.write(format_c_array_rows(data[start:start+chunk_size], n))
+
+def format_c_array_values(values, n=8):
+    # Return blocked C array of (decimal) integer values.
+    separator = ',' + ELEMENT_SEPARATOR
+    lines = [separator.join(map(str, values[i:i+n])) + ',' for i in range(0, len(values), n)]
+    return TEMPLATE_LINE_SEPARATOR.join(lines)
+
 def c_compatible_name(str_name):
     return ''.join([c for c in str_name if match(r'\w', c)])
     
@@ -62,3 +109,43 @@ def blockify(str_list, n=12):
 
     # Return blocked C array.
     return TEMPLATE_LINE_SEPARATOR.join(lines)
+
+def check_alignment(alignment, minimum=4):
+    # Require power of two (at least the given minimum).
+    if alignment < minimum or alignment & (alignment - 1):
+        raise RuntimeError(f'Alignment ({alignment}) must be a power of two and at least {minimum}.')
+
+def _read_umask():
+    # Read the umask of the process (only possible by setting it).
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+# Umask of the process, read once (changing it temporarily is not thread-safe).
+_UMASK = _read_umask()
+
+@contextmanager
+def write_atomic(file_name, mode='w'):
+    # Open file for writing via a temporary file in the same directory, which replaces
+    # the file only when it has been written completely. Readers (e.g., a compiler
+    # running concurrently) therefore never see a partially written file.
+    path = Path(file_name)
+    (fd, tmp_name) = tempfile.mkstemp(dir=path.parent, prefix='.' + path.name + '.', suffix='.tmp')
+    try:
+        try:
+            file = os.fdopen(fd, mode)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        with file:
+            # Use default permissions (mkstemp creates files only readable by the owner).
+            os.chmod(tmp_name, 0o666 & ~_UMASK)
+            yield file
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,200 @@
+from bmp_argb8888_to_c.batch import convert_files
+
+from concurrent.futures import ProcessPoolExecutor
+from ctypes.util import find_library
+from pathlib import Path
+
+import ctypes
+import os
+import select
+import struct
+import time
+
+# Default time without further changes before converting (in seconds).
+DEFAULT_DEBOUNCE = 0.2
+
+# Default interval for polling for changes (in seconds).
+DEFAULT_POLL_INTERVAL = 0.5
+
+# Inotify flags (see inotify(7)): file closed after writing, file moved into the
+# watched directory (e.g., editors saving via rename), non-blocking, close-on-exec.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Header of an inotify event (watch descriptor, mask, cookie, length of name).
+INOTIFY_EVENT = struct.Struct('iIII')
+
+def _is_bitmap(path):
+    return path.suffix.lower() == '.bmp'
+
+class InotifyWatcher:
+    '''
+    Watch directories for changed bitmap files using inotify (Linux only).
+    '''
+
+    def __init__(self, directories):
+        libc_name = find_library('c')
+        if libc_name is None:
+            raise OSError('C library not found')
+
+        libc = ctypes.CDLL(libc_name, use_errno = True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not supported')
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f'Cannot watch directory: {directory}')
+            self.directories[wd] = Path(directory)
+
+    def wait(self, timeout = None):
+        '''
+        Wait for changes (at most `timeout` seconds, or forever if None).
+        Returns the set of changed bitmap files (empty after timeout).
+        '''
+        (readable, _, _) = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            (wd, _, _, length) = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if wd in self.directories and name:
+                path = self.directories[wd] / name
+                if _is_bitmap(path):
+                    changed.add(path)
+
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    '''
+    Watch directories for changed bitmap files by polling modification times and sizes.
+    '''
+
+    def __init__(self, directories, interval = DEFAULT_POLL_INTERVAL):
+        self.directories = [Path(d) for d in directories]
+        self.interval = interval
+        self.state = self._scan()
+
+    def _scan(self):
+        state = {}
+        for directory in self.directories:
+            for path in directory.iterdir():
+                if not _is_bitmap(path):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def wait(self, timeout = None):
+        '''
+        Wait for changes (at most `timeout` seconds, or forever if None).
+        Returns the set of changed bitmap files (empty after timeout).
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+
+            state = self._scan()
+            changed = {path for (path, value) in state.items() if self.state.get(path) != value}
+            self.state = state
+
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+def create_watcher(directories, polling = False):
+    '''
+    Create watcher for the given directories, using inotify if available (unless
+    `polling` is true) and polling otherwise.
+    '''
+    if not polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+
+    return PollingWatcher(directories)
+
+def watch_files(inputs, output_dir, mode, jobs = None, cache_dir = None, debounce = DEFAULT_DEBOUNCE,
+        polling = False, report = None, trace = None, **options):
+    '''
+    Convert bitmap files (given as files or directories) and keep converting them
+    whenever they change, until interrupted (see function `convert_files`).
+
+    Bursts of changes are collected until no further change happens for `debounce`
+    seconds, then only the changed files are converted. The worker processes are
+    kept alive in between, so that the startup cost is only paid once. After each
+    round of conversions, `report` is called with the results (if given). If a list
+    is given as `trace`, the conversions are profiled (see function `convert_files`).
+    '''
+    inputs = [Path(p).resolve() for p in inputs]
+    for path in inputs:
+        if not path.exists():
+            raise RuntimeError(f'No such file or directory: {path}')
+
+    # Watch directories and single files (via their parent directory).
+    files = {p for p in inputs if p.is_file()}
+    directories = sorted({p for p in inputs if p.is_dir()} | {p.parent for p in files})
+
+    def is_watched(path):
+        return path in files or path.parent in inputs
+
+    watcher = create_watcher(directories, polling)
+
+    try:
+        with ProcessPoolExecutor(max_workers = jobs) as executor:
+
+            # Initial conversion of all input files.
+            initial = sorted(files | {p for d in inputs if d.is_dir() for p in d.iterdir() if _is_bitmap(p) and p.is_file()})
+            results = convert_files(initial, output_dir, mode, jobs, cache_dir, executor, trace, **options)
+            if report:
+                report(results)
+
+            while True:
+                changed = watcher.wait()
+
+                # Debounce (wait until files are no longer changing).
+                while True:
+                    more = watcher.wait(debounce)
+                    if not more:
+                        break
+                    changed |= more
+
+                changed = sorted(p.resolve() for p in changed if is_watched(p.resolve()) and p.is_file())
+                if not changed:
+                    continue
+
+                results = convert_files(changed, output_dir, mode, jobs, cache_dir, executor, trace, **options)
+                if report:
+                    report(results)
+
+    finally:
+        watcher.close()
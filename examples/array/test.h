@@ -2,7 +2,7 @@
 #ifndef INCLUDE_TEST_H_
 #define INCLUDE_TEST_H_
 
-const unsigned char test[372UL + 1] __attribute__ ((aligned (4)))
+const unsigned char test[372UL + 1] __attribute__ ((aligned (4))) =
 {
   // BITMAP FILE HEADER
   0x42, 0x4D, // SIGNATURE
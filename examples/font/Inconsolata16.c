@@ -2,7 +2,18 @@
  * Inconsolata, font size 16
  * Licensed under the SIL Open Font License, Version 1.1 (http://scripts.sil.org/OFL).
  */
-#include "fonts_aa.h"
+/* Generated with BmpARGB8888ToC: https://github.com/ewidl/BmpARGB8888ToC */
+#ifndef T_FONT_AA_
+#define T_FONT_AA_
+// Struct for anti-aliased monospace fonts.
+typedef struct _tFont_AA
+{
+  const uint8_t *table;
+  uint16_t width;
+  uint16_t height;
+  uint8_t bpp;
+} sFONT_AA;
+#endif // T_FONT_AA_
 
 const uint8_t Inconsolata16_table[] =
 {
@@ -1722,5 +1733,6 @@ const uint8_t Inconsolata16_table[] =
 sFONT_AA Inconsolata16 = {
   Inconsolata16_table,
   8, // font width
-  16 // font height
+  16, // font height
+  8 // bits per pixel
 };
@@ -1,17 +1,36 @@
 from setuptools import setup, find_packages
 
+from pathlib import Path
+
+import re
+
+# Single source of the version (package __init__, also part of the cache keys).
+version = re.search(
+    r"^__version__ = '([^']+)'", (Path(__file__).parent / 'bmp_argb8888_to_c' / '__init__.py').read_text(), re.M
+    )[1]
+
 setup(
     name = 'bmp_argb8888_to_c',
     maintainer = 'Edmund Widl',
     maintainer_email = 'edmund.widl@gmail.com',
-    version = '0.1',
+    version = version,
     platforms = [ 'any' ],
     packages = find_packages(),
+    extras_require = {
+        'numpy': [ 'numpy' ],
+    },
     entry_points={
         'console_scripts': [
             'argb8888_to_c = bmp_argb8888_to_c.convert:argb8888_to_c',
             'argb8888_to_c_aligned = bmp_argb8888_to_c.convert:argb8888_to_c_aligned',
             'argb8888_to_c_font = bmp_argb8888_to_c.convert:argb8888_to_c_font',
+            'argb8888_to_c_font_pack = bmp_argb8888_to_c.convert:argb8888_to_c_font_pack',
+            'argb8888_to_c_batch = bmp_argb8888_to_c.convert:argb8888_to_c_batch',
+            'argb8888_to_c_watch = bmp_argb8888_to_c.convert:argb8888_to_c_watch',
+            'argb8888_to_bin = bmp_argb8888_to_c.convert:argb8888_to_bin',
+            'argb8888_to_bundle = bmp_argb8888_to_c.convert:argb8888_to_bundle',
+            'argb8888_info = bmp_argb8888_to_c.convert:argb8888_info',
+            'argb8888_delta = bmp_argb8888_to_c.convert:argb8888_delta',
         ]
     },
     description = 'Read content of bitmap file in ARGB8888 format and convert to C array.',
@@ -0,0 +1,43 @@
+from bmp_argb8888_to_c.bundle import ASSET_FORMATS, BUNDLE_ENTRY, BUNDLE_HEADER, BundleAsset, write_bundle
+
+from io import BytesIO
+
+import unittest
+
+class TestBundle(unittest.TestCase):
+
+    def setUp(self):
+        self.assets = [
+            BundleAsset('logo', bytes(range(4)) * 15, 5, 3, 'ARGB8888', 1),
+            BundleAsset('icon', b'\x01\x02\x03', 3, 1, 'L8', 1),
+            BundleAsset('font', b'\xAA' * 10, 4, 5, 'A4', 2),
+        ]
+
+    def test_layout(self):
+        file = BytesIO()
+        (entries, size) = write_bundle(file, self.assets, 32)
+        bundle = file.getvalue()
+        self.assertEqual(len(bundle), size)
+
+        # Header: magic, version, number of assets, alignment.
+        self.assertEqual(BUNDLE_HEADER.unpack_from(bundle), (b'BMPB', 1, 3, 32))
+
+        # Index table (16 bytes per entry), data aligned to 32 bytes (header and index table take 60 bytes).
+        self.assertEqual(BUNDLE_ENTRY.size, 16)
+        expected = [(64, 60, 5, 3, ASSET_FORMATS['ARGB8888'], 0, 1), (128, 3, 3, 1, ASSET_FORMATS['L8'], 0, 1),
+            (160, 10, 4, 5, ASSET_FORMATS['A4'], 0, 2)]
+        for (i, (asset, entry)) in enumerate(zip(self.assets, expected)):
+            self.assertEqual(BUNDLE_ENTRY.unpack_from(bundle, BUNDLE_HEADER.size + i * BUNDLE_ENTRY.size), entry)
+            self.assertEqual(bundle[entry[0]:entry[0] + entry[1]], asset.data)
+        self.assertEqual([(e.offset, e.size) for e in entries], [(e[0], e[1]) for e in expected])
+        self.assertEqual(size, 170)
+
+        # Padding is zero.
+        self.assertEqual(bundle[124:128], bytes(4))
+
+    def test_duplicate_names(self):
+        with self.assertRaises(RuntimeError):
+            write_bundle(BytesIO(), self.assets + self.assets[:1])
+
+if __name__ == '__main__':
+    unittest.main()
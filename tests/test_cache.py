@@ -0,0 +1,43 @@
+from bmp_argb8888_to_c import cache as cache_module
+from bmp_argb8888_to_c.cache import ConversionCache
+
+from pathlib import Path
+
+import tempfile
+import unittest
+
+class TestConversionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input_file = self.dir / 'input.bmp'
+        self.input_file.write_bytes(b'BM' + bytes(68))
+        self.cache = ConversionCache(self.dir / 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_and_restore(self):
+        key = self.cache.key(self.input_file, 'array', name = 'input')
+        out_file = self.dir / 'input.h'
+        self.assertIsNone(self.cache.restore(key, out_file))
+
+        out_file.write_text('generated')
+        self.cache.store(key, out_file, dict(compression_ratio = 2.5))
+        out_file.unlink()
+
+        self.assertEqual(self.cache.restore(key, out_file), dict(compression_ratio = 2.5))
+        self.assertEqual(out_file.read_text(), 'generated')
+
+    def test_key_depends_on_sources(self):
+        key = self.cache.key(self.input_file, 'array')
+        original = cache_module.source_digest
+        cache_module.source_digest = lambda: 'modified'
+        try:
+            self.assertNotEqual(self.cache.key(self.input_file, 'array'), key)
+        finally:
+            cache_module.source_digest = original
+
+if __name__ == '__main__':
+    unittest.main()
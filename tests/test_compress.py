@@ -0,0 +1,93 @@
+from bmp_argb8888_to_c.compress import RLE_MAX_COUNT, compress_rows, lz4_compress, rle_encode
+
+import random
+import unittest
+
+def rle_decode(data):
+    # Reference decoder (see `rle_encode`).
+    (out, pos) = (bytearray(), 0)
+    while pos < len(data):
+        header = data[pos]
+        pos += 1
+        if header & 0x80:
+            out.extend(data[pos:pos+4] * ((header & 0x7F) + 1))
+            pos += 4
+        else:
+            out.extend(data[pos:pos+4*(header+1)])
+            pos += 4 * (header + 1)
+    return bytes(out)
+
+def lz4_decompress(block):
+    # Reference decoder for the LZ4 block format.
+    (out, pos) = (bytearray(), 0)
+
+    def length(value):
+        nonlocal pos
+        if value == 15:
+            while True:
+                byte = block[pos]
+                pos += 1
+                value += byte
+                if byte != 255:
+                    break
+        return value
+
+    while True:
+        token = block[pos]
+        pos += 1
+        literal_length = length(token >> 4)
+        out.extend(block[pos:pos+literal_length])
+        pos += literal_length
+        if pos == len(block):
+            return bytes(out)
+        offset = int.from_bytes(block[pos:pos+2], 'little')
+        pos += 2
+        for _ in range(length(token & 0x0F) + 4):
+            out.append(out[-offset])
+
+def _samples():
+    rng = random.Random(0)
+    pixels = [rng.randbytes(4) for _ in range(8)]
+    return [
+        b'',
+        bytes(4),
+        rng.randbytes(4 * 300),
+        bytes(4 * 1000),
+        b''.join(rng.choice(pixels) * rng.randint(1, 300) for _ in range(50)),
+        ]
+
+class TestRLE(unittest.TestCase):
+
+    def test_round_trip(self):
+        for data in _samples():
+            self.assertEqual(rle_decode(rle_encode(data)), data)
+
+    def test_packets(self):
+        # Run split into packets of at most RLE_MAX_COUNT pixels, single pixels are literals.
+        pixel = b'\x01\x02\x03\x04'
+        self.assertEqual(rle_encode(pixel * (RLE_MAX_COUNT + 1)), b'\xFF' + pixel + b'\x00' + pixel)
+
+class TestLZ4(unittest.TestCase):
+
+    def test_round_trip(self):
+        for data in _samples():
+            self.assertEqual(lz4_decompress(lz4_compress(data)), data)
+
+    def test_compresses_repetitions(self):
+        data = bytes(range(4)) * 4096
+        self.assertLess(len(lz4_compress(data)), len(data) // 50)
+
+    def test_rows(self):
+        data = _samples()[4][:4 * 40 * 20]
+        for method in ('rle', 'lz4'):
+            decode = rle_decode if method == 'rle' else lz4_decompress
+            compressed = compress_rows(data, 4 * 40, method)
+            self.assertEqual(len(compressed.row_offsets), 21)
+            rows = [
+                decode(compressed.data[start:end])
+                for (start, end) in zip(compressed.row_offsets, compressed.row_offsets[1:])
+                ]
+            self.assertEqual(b''.join(rows), data)
+
+if __name__ == '__main__':
+    unittest.main()
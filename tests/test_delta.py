@@ -0,0 +1,61 @@
+from bmp_argb8888_to_c.delta import DELTA_HEADER, DELTA_RANGE, DeltaRange, changed_ranges, sector_crcs, write_delta
+
+from io import BytesIO
+
+import unittest
+
+def apply_delta(old, delta):
+    # Reference implementation of applying a delta (see `write_delta`).
+    (_, _, _, _, _, new_size, _, _, count) = DELTA_HEADER.unpack_from(delta)
+    new = bytearray(old[:new_size].ljust(new_size, b'\0'))
+    pos = DELTA_HEADER.size
+    for _ in range(count):
+        (offset, length) = DELTA_RANGE.unpack_from(delta, pos)
+        pos += DELTA_RANGE.size
+        new[offset:offset + length] = delta[pos:pos + length]
+        pos += length
+    return bytes(new)
+
+class TestDelta(unittest.TestCase):
+
+    def test_changed_ranges(self):
+        old = bytes(40)
+        new = bytearray(old)
+        new[5] = 1   # block 0 (0-8)
+        new[12] = 1  # block 1 (8-16), merged with block 0
+        new[33] = 1  # block 4 (32-40)
+        self.assertEqual(changed_ranges(old, new, 8), [DeltaRange(0, 16), DeltaRange(32, 8)])
+        self.assertEqual(changed_ranges(old, old, 8), [])
+
+    def test_changed_ranges_with_base(self):
+        # Header (before base) is a block of its own, then rows of 10 bytes.
+        old = bytes(36)
+        new = bytearray(old)
+        new[2] = 1
+        new[27] = 1
+        self.assertEqual(changed_ranges(old, new, 10, base = 6), [DeltaRange(0, 6), DeltaRange(26, 10)])
+
+    def test_changed_ranges_larger(self):
+        # Data appended to the new version is changed.
+        self.assertEqual(changed_ranges(bytes(10), bytes(14), 4), [DeltaRange(8, 6)])
+
+    def test_sector_crcs(self):
+        self.assertEqual(sector_crcs(b'123456789', 9), [0xCBF43926])
+        self.assertEqual(sector_crcs(b'123456789' * 2 + b'1', 9), [0xCBF43926, 0xCBF43926, 0x83DCEFB7])
+        self.assertEqual(sector_crcs(b''), [])
+
+    def test_write_delta(self):
+        old = bytes(range(200))
+        new = bytearray(old)
+        new[10:20] = bytes(10)
+        new[150] = 0xFF
+        ranges = changed_ranges(old, new, 16)
+        file = BytesIO()
+        size = write_delta(file, old, new, ranges, 16)
+        delta = file.getvalue()
+        self.assertEqual(size, len(delta))
+        self.assertEqual(size, DELTA_HEADER.size + len(ranges) * DELTA_RANGE.size + sum(r.length for r in ranges))
+        self.assertEqual(apply_delta(old, delta), bytes(new))
+
+if __name__ == '__main__':
+    unittest.main()
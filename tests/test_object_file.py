@@ -0,0 +1,71 @@
+from bmp_argb8888_to_c.object_file import ELF_MACHINES, elf_object
+
+import struct
+import unittest
+
+def parse_elf(content):
+    # Parse ELF header, section headers (with names) and symbols (with names).
+    is_64 = content[4] == 2
+    word = 'Q' if is_64 else 'I'
+    ehdr = struct.Struct('<16sHHI' + word * 3 + 'IHHHHHH')
+    shdr = struct.Struct('<IIQQQQIIQQ' if is_64 else '<IIIIIIIIII')
+
+    header = ehdr.unpack_from(content)
+    (shoff, shentsize, shnum, shstrndx) = (header[6], header[11], header[12], header[13])
+    headers = [shdr.unpack_from(content, shoff + i * shentsize) for i in range(shnum)]
+
+    def string(section, offset):
+        start = headers[section][4] + offset
+        return content[start:content.index(b'\0', start)].decode('utf-8')
+
+    sections = {string(shstrndx, s[0]): (index, s) for (index, s) in enumerate(headers)}
+
+    (symtab_index, symtab) = sections['.symtab']
+    symbols = {}
+    for offset in range(symtab[4], symtab[4] + symtab[5], symtab[9]):
+        if is_64:
+            (name, info, _, shndx, value, size) = struct.unpack_from('<IBBHQQ', content, offset)
+        else:
+            (name, value, size, info, _, shndx) = struct.unpack_from('<IIIBBH', content, offset)
+        symbols[string(symtab[6], name)] = (value, size, info, shndx)
+
+    return (header, sections, symbols)
+
+class TestElfObject(unittest.TestCase):
+
+    def check(self, machine, alignment):
+        data = bytes(range(256)) * 3 + b'\x01\x02'
+        content = elf_object('image', data, machine, alignment)
+        (header, sections, symbols) = parse_elf(content)
+        target = ELF_MACHINES[machine]
+
+        # ELF header: class, little-endian, relocatable object for the target machine.
+        self.assertEqual(header[0][:7], b'\x7fELF' + bytes([target.elf_class // 32, 1, 1]))
+        self.assertEqual((header[1], header[2], header[7]), (1, target.machine, target.flags))
+
+        # Data in read-only section with the given alignment.
+        (rodata_index, rodata) = sections['.rodata.image']
+        (_, sh_type, flags, _, offset, size, _, _, addralign, _) = rodata
+        self.assertEqual((sh_type, flags, size, addralign), (1, 0x2, len(data), alignment))
+        self.assertEqual(offset % alignment, 0)
+        self.assertEqual(content[offset:offset + size], data)
+
+        # Global symbols for start (with size) and end of the data.
+        self.assertEqual(symbols['image'], (0, len(data), 0x11, rodata_index))
+        self.assertEqual(symbols['image_end'], (len(data), 0, 0x10, rodata_index))
+
+        # First global symbol (sh_info of the symbol table).
+        self.assertEqual(sections['.symtab'][1][7], 2)
+
+        # Empty section for a non-executable stack.
+        (_, note) = sections['.note.GNU-stack']
+        self.assertEqual((note[1], note[2], note[5]), (1, 0, 0))
+
+    def test_32_bit(self):
+        self.check('arm', 4)
+
+    def test_64_bit(self):
+        self.check('x86_64', 32)
+
+if __name__ == '__main__':
+    unittest.main()
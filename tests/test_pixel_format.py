@@ -0,0 +1,57 @@
+from bmp_argb8888_to_c import pixel_format
+from bmp_argb8888_to_c.pixel_format import convert_pixels
+
+from array import array
+
+import random
+import time
+import unittest
+
+def _pixels(colors):
+    # Pixel array (little-endian 32-bit values 0xAARRGGBB).
+    return array('I', colors).tobytes()
+
+def _clut_alpha(clut):
+    return {clut[i + 3] for i in range(0, len(clut), 4)}
+
+class TestMedianCut(unittest.TestCase):
+    '''
+    Alpha must not be affected by the color reduction of the median cut quantizer.
+    '''
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.colors = [rng.getrandbits(24) for _ in range(1024)]
+
+    def test_opaque(self):
+        (indices, clut) = convert_pixels(_pixels([0xFF000000 | c for c in self.colors]), 'L8', 16)
+        self.assertEqual(len(indices), len(self.colors))
+        self.assertEqual(_clut_alpha(clut), {0xFF})
+
+    def test_transparent_and_opaque(self):
+        colors = [(0xFF000000 if i % 2 else 0) | c for (i, c) in enumerate(self.colors)]
+        (_, clut) = convert_pixels(_pixels(colors), 'L8', 16)
+        self.assertEqual(_clut_alpha(clut), {0x00, 0xFF})
+
+    def test_without_numpy(self):
+        # Same indices and palette with and without NumPy.
+        data = random.Random(1).randbytes(64 * 64 * 4)
+        result = convert_pixels(data, 'L8', 32)
+        (numpy, pixel_format.numpy) = (pixel_format.numpy, None)
+        try:
+            self.assertEqual(convert_pixels(data, 'L8', 32), result)
+        finally:
+            pixel_format.numpy = numpy
+
+    @unittest.skipIf(pixel_format.numpy is None, 'requires NumPy')
+    def test_large_image(self):
+        # Random 1024x1024 image (about one million distinct colors).
+        data = random.Random(2).randbytes(1024 * 1024 * 4)
+        start = time.perf_counter()
+        (indices, clut) = convert_pixels(data, 'L8')
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertEqual(len(indices), 1024 * 1024)
+        self.assertEqual(len(clut), 256 * 4)
+
+if __name__ == '__main__':
+    unittest.main()
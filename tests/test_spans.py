@@ -0,0 +1,47 @@
+from bmp_argb8888_to_c.spans import MAX_SPAN_LENGTH, SPAN_BLENDED, SPAN_LENGTH_BITS, SPAN_OPAQUE, SPAN_TRANSPARENT
+from bmp_argb8888_to_c.spans import span_fractions, span_table
+
+import unittest
+
+def span(kind, length):
+    return (kind << SPAN_LENGTH_BITS) | length
+
+class TestSpanTable(unittest.TestCase):
+
+    def test_packing(self):
+        # Kind in the upper 2 bits, length in the lower 14 bits.
+        self.assertEqual(MAX_SPAN_LENGTH, 16383)
+        self.assertEqual(span(SPAN_BLENDED, MAX_SPAN_LENGTH), 0xBFFF)
+        self.assertEqual(span(SPAN_OPAQUE, 1), 0x4001)
+
+    def test_rows(self):
+        # Two rows of 6 pixels (runs do not continue across rows).
+        alpha = bytes([0, 0, 255, 255, 128, 0,  0, 255, 254, 1, 255, 255])
+        table = span_table(alpha, 6, 2)
+        self.assertEqual(table.spans, [
+            span(SPAN_TRANSPARENT, 2), span(SPAN_OPAQUE, 2), span(SPAN_BLENDED, 1), span(SPAN_TRANSPARENT, 1),
+            span(SPAN_TRANSPARENT, 1), span(SPAN_OPAQUE, 1), span(SPAN_BLENDED, 2), span(SPAN_OPAQUE, 2),
+            ])
+        self.assertEqual(table.row_offsets, [0, 4, 8])
+        self.assertEqual(table.counts, [4, 5, 3])
+        self.assertEqual(span_fractions(table), dict(transparent_pixels = 4 / 12, opaque_pixels = 5 / 12,
+            blended_pixels = 3 / 12))
+
+    def test_opaque_level(self):
+        # Quantized alpha (e.g., 2 bits per pixel): the maximum level is opaque.
+        table = span_table(bytes([3, 3, 2, 0]), 4, 1, opaque = 3)
+        self.assertEqual(table.spans, [span(SPAN_OPAQUE, 2), span(SPAN_BLENDED, 1), span(SPAN_TRANSPARENT, 1)])
+
+    def test_long_runs(self):
+        # Runs longer than MAX_SPAN_LENGTH are split.
+        width = 2 * MAX_SPAN_LENGTH + 10
+        table = span_table(bytes(width) + bytes([255]) * width, width, 2)
+        self.assertEqual(table.spans, [
+            span(SPAN_TRANSPARENT, MAX_SPAN_LENGTH), span(SPAN_TRANSPARENT, MAX_SPAN_LENGTH), span(SPAN_TRANSPARENT, 10),
+            span(SPAN_OPAQUE, MAX_SPAN_LENGTH), span(SPAN_OPAQUE, MAX_SPAN_LENGTH), span(SPAN_OPAQUE, 10),
+            ])
+        self.assertEqual(table.row_offsets, [0, 3, 6])
+        self.assertTrue(all(s & MAX_SPAN_LENGTH for s in table.spans))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+from bmp_argb8888_to_c.tiles import split_tiles
+
+import unittest
+
+# Pixel values (1 byte per pixel) of a 5x4 image, rows from top to bottom: the two
+# left 2x2 tiles are identical, the right column of tiles is padded with zeros.
+IMAGE = [
+    b'\x01\x02\x01\x02\x07',
+    b'\x03\x04\x03\x04\x08',
+    b'\x01\x02\x05\x06\x00',
+    b'\x03\x04\x05\x06\x00',
+    ]
+
+class TestSplitTiles(unittest.TestCase):
+
+    def check(self, tiled):
+        self.assertEqual((tiled.tile_size, tiled.tiles_x, tiled.tiles_y), (2, 3, 2))
+        self.assertEqual(tiled.tile_map, [0, 0, 1, 0, 2, 3])
+        self.assertEqual(tiled.tiles, b'\x01\x02\x03\x04' + b'\x07\x00\x08\x00' + b'\x05\x06\x05\x06' + bytes(4))
+
+    def test_bottom_up(self):
+        self.check(split_tiles(b''.join(reversed(IMAGE)), 5, 4, 2, bytes_per_pixel = 1))
+
+    def test_top_down(self):
+        self.check(split_tiles(b''.join(IMAGE), 5, 4, 2, top_down = True, bytes_per_pixel = 1))
+
+    def test_argb8888(self):
+        pixels = bytes(b for row in IMAGE for v in row for b in (v, 0, 0, 0xFF))
+        tiled = split_tiles(pixels, 5, 4, 2, top_down = True)
+        self.assertEqual(tiled.tile_map, [0, 0, 1, 0, 2, 3])
+        self.assertEqual(len(tiled.tiles), 4 * 2 * 2 * 4)
+
+if __name__ == '__main__':
+    unittest.main()